@@ -0,0 +1,109 @@
+"""
+AeroHealth Aggregates
+Rolling per-state, per-region and per-tier AQI statistics
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from simulation import CitySample
+
+DIMENSIONS = ("state", "region", "tier")
+PERCENTILES = (50, 90, 95)
+
+
+class GroupStats:
+    """Running sums plus a sorted list of members' AQI values
+
+    Adding or removing a city adjusts the sums and moves one list entry, so
+    mean, weighted mean, extremes and percentiles are always ready to read.
+    """
+
+    __slots__ = ("count", "total", "weighted_total", "weight", "values")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.weighted_total = 0
+        self.weight = 0
+        self.values: List[int] = []
+
+    def add(self, aqi: int, population: int) -> None:
+        self.count += 1
+        self.total += aqi
+        self.weighted_total += aqi * population
+        self.weight += population
+        insort(self.values, aqi)
+
+    def remove(self, aqi: int, population: int) -> None:
+        self.count -= 1
+        self.total -= aqi
+        self.weighted_total -= aqi * population
+        self.weight -= population
+        del self.values[bisect_left(self.values, aqi)]
+
+    def percentile(self, p: int) -> int:
+        """Nearest-rank percentile"""
+        rank = max(1, -(-p * self.count // 100))
+        return self.values[rank - 1]
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {"cities": 0}
+        return {
+            "cities": self.count,
+            "mean_aqi": round(self.total / self.count, 1),
+            "population_weighted_aqi": round(self.weighted_total / self.weight, 1) if self.weight else None,
+            "min_aqi": self.values[0],
+            "max_aqi": self.values[-1],
+            **{f"p{p}_aqi": self.percentile(p) for p in PERCENTILES},
+            "population": self.weight,
+        }
+
+
+class AggregateIndex:
+    """Reading listener maintaining GroupStats for every state, region and tier"""
+
+    def __init__(self, store):
+        self.store = store
+        self._aqi: Dict[int, int] = {}
+        self._groups: Dict[Tuple[str, Hashable], GroupStats] = {}
+        self.overall = GroupStats()
+        self.version = 0
+        self._summary_version = -1
+        self._summary: Optional[Dict] = None
+
+    def _group_keys(self, idx: int) -> Tuple[Tuple[str, Hashable], ...]:
+        store = self.store
+        return (("state", store.state_code[idx]), ("region", store.region_code[idx]), ("tier", store.tier[idx]))
+
+    def update(self, idx: int, sample: CitySample) -> None:
+        old = self._aqi.get(idx)
+        if old == sample.aqi:
+            return
+        population = self.store.population[idx]
+        groups = [self.overall] + [self._groups.setdefault(key, GroupStats()) for key in self._group_keys(idx)]
+        for group in groups:
+            if old is not None:
+                group.remove(old, population)
+            group.add(sample.aqi, population)
+        self._aqi[idx] = sample.aqi
+        self.version += 1
+
+    def summary(self) -> Dict:
+        """All group summaries, rebuilt only after readings have changed"""
+        if self._summary_version != self.version:
+            store = self.store
+            labels = {
+                "state": lambda code: store.states[code],
+                "region": lambda code: store.regions[code],
+                "tier": lambda tier: f"tier_{tier}",
+            }
+            result = {"overall": self.overall.summary(), **{dimension: {} for dimension in DIMENSIONS}}
+            for (dimension, key), group in self._groups.items():
+                result[dimension][labels[dimension](key)] = group.summary()
+            for dimension in DIMENSIONS:
+                result[dimension] = dict(sorted(result[dimension].items()))
+            self._summary = result
+            self._summary_version = self.version
+        return self._summary
@@ -0,0 +1,278 @@
+"""
+AeroHealth City Store
+Columnar, array-backed store for the 500+ Indian cities dataset
+"""
+
+import json
+import logging
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Single source of truth shared with the frontend
+DEFAULT_DATASET = Path(__file__).resolve().parents[2] / "frontend" / "data" / "cities-500.js"
+CITY_DATASET = Path(os.environ.get("AEROHEALTH_CITY_DATA", DEFAULT_DATASET))
+CITY_SNAPSHOT = os.environ.get("AEROHEALTH_CITY_SNAPSHOT")
+
+SNAPSHOT_MAGIC = b"AHCS"
+SNAPSHOT_VERSION = 1
+# Column name -> array typecode, in snapshot order
+COLUMNS = [
+    ("lat", "d"),
+    ("lon", "d"),
+    ("population", "I"),
+    ("base_aqi", "H"),
+    ("state_code", "H"),
+    ("tier", "B"),
+    ("region_code", "B"),
+]
+
+_ARRAY_PATTERN = re.compile(r"INDIAN_CITIES_500\s*=\s*\[(?P<body>.*?)^\s*\];", re.S | re.M)
+_ENTRY_PATTERN = re.compile(r"\{(?P<fields>[^{}]*)\}")
+# One `key: "text"` or `key: number` pair and its trailing comma, in any order
+_FIELD_PATTERN = re.compile(r'\s*(?P<key>\w+)\s*:\s*(?:"(?P<text>[^"]*)"|(?P<number>-?\d+(?:\.\d+)?))\s*(?:,|$)')
+# Entry field -> parser
+_CITY_FIELDS = {
+    "name": str, "state": str, "region": str, "tier": int,
+    "lat": float, "lon": float, "population": int, "aqi_base": int,
+}
+
+
+def _parse_entry(fields: str) -> Dict:
+    """Fields of one dataset entry; raises ValueError naming what is wrong"""
+    values = {}
+    pos = 0
+    while pos < len(fields.rstrip()):
+        match = _FIELD_PATTERN.match(fields, pos)
+        if match is None:
+            raise ValueError(f"cannot read {fields[pos:].strip()[:40]!r}")
+        key = match["key"]
+        if key in _CITY_FIELDS:
+            raw = match["text"] if match["text"] is not None else match["number"]
+            values[key] = _CITY_FIELDS[key](raw)
+        pos = match.end()
+    missing = [key for key in _CITY_FIELDS if key not in values]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return values
+
+
+class CityInfo(NamedTuple):
+    name: str
+    state: str
+    region: str
+    tier: int
+    lat: float
+    lon: float
+    population: int
+    base_aqi: int
+
+
+class CityStore:
+    """Cities stored as parallel typed arrays with an interned name -> index map
+
+    States and regions are dictionary-encoded: the columns hold small integer
+    codes into the `states` / `regions` vocabularies.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.states: List[str] = []
+        self.regions: List[str] = []
+        self.index: Dict[str, int] = {}
+        for column, typecode in COLUMNS:
+            setattr(self, column, array(typecode))
+        self._state_codes: Dict[str, int] = {}
+        self._region_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def add(self, name: str, state: str, region: str, tier: int, lat: float, lon: float,
+            population: int, base_aqi: int) -> int:
+        """Append a city and return its index (an existing name keeps its first entry)"""
+        if name in self.index:
+            return self.index[name]
+
+        idx = len(self.names)
+        name = sys.intern(name)
+        self.names.append(name)
+        self.index[name] = idx
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.population.append(population)
+        self.base_aqi.append(base_aqi)
+        self.state_code.append(self._encode(state, self.states, self._state_codes))
+        self.region_code.append(self._encode(region, self.regions, self._region_codes))
+        self.tier.append(tier)
+        return idx
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Return the index of a city by exact name, or None"""
+        return self.index.get(name)
+
+    def state(self, idx: int) -> str:
+        return self.states[self.state_code[idx]]
+
+    def region(self, idx: int) -> str:
+        return self.regions[self.region_code[idx]]
+
+    def info(self, idx: int) -> CityInfo:
+        """Materialize one row"""
+        return CityInfo(
+            self.names[idx], self.state(idx), self.region(idx), self.tier[idx],
+            self.lat[idx], self.lon[idx], self.population[idx], self.base_aqi[idx]
+        )
+
+    def state_code_for(self, state: str) -> Optional[int]:
+        """Case-insensitive state name -> code"""
+        return self._state_codes.get(state.lower())
+
+    def region_code_for(self, region: str) -> Optional[int]:
+        """Case-insensitive region name -> code"""
+        return self._region_codes.get(region.lower())
+
+    def select(self, tier: Optional[int] = None, state: Optional[str] = None,
+               region: Optional[str] = None) -> List[int]:
+        """Return indices of cities matching every given filter"""
+        indices = range(len(self.names))
+        if tier is not None:
+            indices = [i for i in indices if self.tier[i] == tier]
+        if state:
+            code = self.state_code_for(state)
+            indices = [i for i in indices if self.state_code[i] == code]
+        if region:
+            code = self.region_code_for(region)
+            indices = [i for i in indices if self.region_code[i] == code]
+        return list(indices)
+
+    @staticmethod
+    def _encode(value: str, vocabulary: List[str], codes: Dict[str, int]) -> int:
+        key = value.lower()
+        code = codes.get(key)
+        if code is None:
+            code = len(vocabulary)
+            vocabulary.append(sys.intern(value))
+            codes[key] = code
+        return code
+
+    # ------------------------------------------------------------------
+    # Loading and snapshots
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_js(cls, path: Path) -> "CityStore":
+        """Parse the `INDIAN_CITIES_500` array from the frontend dataset
+
+        Entries that cannot be parsed, and repeated names (the first entry
+        wins), are skipped with a warning naming their line.
+        """
+        store = cls()
+        text = Path(path).read_text(encoding="utf-8")
+        array_match = _ARRAY_PATTERN.search(text)
+        if array_match is None:
+            raise ValueError(f"No INDIAN_CITIES_500 array in {path}")
+
+        first_line: Dict[str, int] = {}
+        skipped = 0
+        for match in _ENTRY_PATTERN.finditer(text, array_match.start("body"), array_match.end("body")):
+            line = text.count("\n", 0, match.start()) + 1
+            try:
+                city = _parse_entry(match["fields"])
+            except ValueError as e:
+                logger.warning(f"⚠️ Skipping city entry at {Path(path).name}:{line}: {e}")
+                skipped += 1
+                continue
+            if city["name"] in first_line:
+                logger.warning(f"⚠️ Skipping duplicate city {city['name']} at {Path(path).name}:{line} "
+                               f"(first defined on line {first_line[city['name']]})")
+                skipped += 1
+                continue
+            first_line[city["name"]] = line
+            store.add(city["name"], city["state"], city["region"], city["tier"],
+                      city["lat"], city["lon"], city["population"], city["aqi_base"])
+        if skipped:
+            logger.warning(f"⚠️ Loaded {len(store)} cities from {Path(path).name}; skipped {skipped} entries")
+        return store
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact binary snapshot: header, JSON vocabularies, raw columns"""
+        vocab = json.dumps({"names": self.names, "states": self.states, "regions": self.regions},
+                           ensure_ascii=False, separators=(",", ":")).encode()
+        parts = [SNAPSHOT_MAGIC, struct.pack("<HII", SNAPSHOT_VERSION, len(self.names), len(vocab)), vocab]
+        for column, _ in COLUMNS:
+            parts.append(getattr(self, column).tobytes())
+        return b"".join(parts)
+
+    @staticmethod
+    def columns_offset(data) -> int:
+        """Byte offset of the first column within a snapshot"""
+        return 4 + struct.calcsize("<HII") + struct.unpack_from("<HII", data, 4)[2]
+
+    @classmethod
+    def from_bytes(cls, data, copy: bool = True) -> "CityStore":
+        """Load a snapshot produced by `to_bytes`
+
+        With copy=False the columns are typed memoryviews over `data` itself
+        (e.g. a shared-memory segment), which must then outlive the store and
+        have its columns 8-byte aligned.
+        """
+        data = memoryview(data)
+        if bytes(data[:4]) != SNAPSHOT_MAGIC:
+            raise ValueError("Not an AeroHealth city snapshot")
+        version, count, vocab_len = struct.unpack_from("<HII", data, 4)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported city snapshot version {version}")
+
+        offset = 4 + struct.calcsize("<HII")
+        vocab = json.loads(bytes(data[offset:offset + vocab_len]))
+        offset += vocab_len
+
+        store = cls()
+        store.names = [sys.intern(name) for name in vocab["names"]]
+        store.states = vocab["states"]
+        store.regions = vocab["regions"]
+        store.index = {name: i for i, name in enumerate(store.names)}
+        store._state_codes = {s.lower(): i for i, s in enumerate(store.states)}
+        store._region_codes = {r.lower(): i for i, r in enumerate(store.regions)}
+        for column, typecode in COLUMNS:
+            size = array(typecode).itemsize * count
+            if copy:
+                values = array(typecode)
+                values.frombytes(data[offset:offset + size])
+            else:
+                values = data[offset:offset + size].cast(typecode)
+            setattr(store, column, values)
+            offset += size
+        return store
+
+    def save_snapshot(self, path: Path) -> None:
+        Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load_snapshot(cls, path: Path) -> "CityStore":
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+def load_city_store() -> CityStore:
+    """Load the prebuilt snapshot when configured, otherwise parse the dataset"""
+    if CITY_SNAPSHOT and Path(CITY_SNAPSHOT).exists():
+        return CityStore.load_snapshot(Path(CITY_SNAPSHOT))
+    return CityStore.from_js(CITY_DATASET)
+
+
+if __name__ == "__main__":
+    # Build a binary snapshot: python city_store.py cities.bin
+    target = Path(sys.argv[1] if len(sys.argv) > 1 else "cities.bin")
+    store = CityStore.from_js(CITY_DATASET)
+    store.save_snapshot(target)
+    print(f"✅ Wrote {len(store)} cities to {target}")
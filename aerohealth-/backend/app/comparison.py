@@ -0,0 +1,79 @@
+"""
+AeroHealth Comparison
+N-way city comparison matrices built from current readings and the forecast matrix in one pass
+"""
+
+import os
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+from forecast import ForecastMatrix
+from simulation import CitySample
+
+COMPARE_MAX = int(os.environ.get("AEROHEALTH_COMPARE_MAX", "50"))
+
+# |AQI gap| limits between two cities, as used by the browser's comparison advice
+DIFFERENCE_LIMITS = [25, 50]
+DIFFERENCES = ["similar", "moderate", "significant"]
+DIFFERENCE_ADVICE = [
+    "Similar health impacts - other factors like personal tolerance matter more",
+    "Moderate difference - consider personal sensitivity levels",
+    "Significant health difference - choose the cleaner city for sensitive individuals",
+]
+
+
+def delta_matrix(values: Sequence[int], scale: int = 1) -> List[List]:
+    """Row i holds values[i] - values[j] for every j
+
+    Values are integers in units of 1/scale, so every subtraction is exact
+    and a scaled delta needs one division rather than a float round().
+    """
+    rows = [[a - b for b in values] for a in values]
+    if scale == 1:
+        return rows
+    return [[x / scale for x in row] for row in rows]
+
+
+def difference_levels(deltas: List[List[int]]) -> List[List[int]]:
+    """Index into DIFFERENCES for every AQI delta, via a table over the delta range"""
+    span = max(max(map(abs, row)) for row in deltas)
+    half = [bisect_left(DIFFERENCE_LIMITS, gap) for gap in range(span + 1)]
+    table = half[:0:-1] + half  # table[d + span] for d in -span..span
+    return [[table[d + span] for d in row] for row in deltas]
+
+
+def compare(indices: List[int], samples: List[CitySample], aod: List[float], matrix: ForecastMatrix, days: int) -> Dict:
+    """Value columns, pairwise delta matrices and forecast rows for the selected cities
+
+    `aod` holds the selected cities' AOD as /current reports it (satellite
+    when covered). `deltas[metric][i][j]` is city i minus city j; a negative
+    AQI delta means city i currently has the cleaner air.
+    """
+    selected = [samples[i] for i in indices]
+    aqi = [sample.aqi for sample in selected]
+    pm25 = [sample.pm25 for sample in selected]
+
+    rows = [matrix.row(i)[:days].tolist() for i in indices]
+    # Fixed point: AOD in thousandths, forecast means in tenths
+    aod_milli = [round(value * 1000) for value in aod]
+    forecast_tenths = [round(sum(row) * 10 / days) for row in rows]
+    aqi_deltas = delta_matrix(aqi)
+
+    order = sorted(range(len(indices)), key=aqi.__getitem__)
+    return {
+        "values": {"aqi": aqi, "pm25_value": pm25, "aod": aod,
+                   "forecast_aqi": [tenths / 10 for tenths in forecast_tenths]},
+        "deltas": {
+            "aqi": aqi_deltas,
+            "pm25_value": delta_matrix(pm25),
+            "aod": delta_matrix(aod_milli, 1000),
+            "forecast_aqi": delta_matrix(forecast_tenths, 10),
+        },
+        "difference": difference_levels(aqi_deltas),
+        "forecast": {
+            "aqi": rows,
+            "change": [row[-1] - today for row, today in zip(rows, aqi)],
+            "trend": [matrix.trend[i] for i in indices],
+        },
+        "order": order,
+    }
@@ -0,0 +1,156 @@
+"""
+AeroHealth Forecast Engine
+Precomputed city x day forecast matrix, rebuilt once per time bucket
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+from typing import List, NamedTuple, Optional
+
+from simulation import FORECAST_TRENDS, CitySample, SimulationEngine
+
+logger = logging.getLogger(__name__)
+
+FORECAST_DAYS = 7
+FORECAST_BAND_LIMITS = [50, 100, 150]
+FORECAST_CATEGORIES = ["Good", "Moderate", "USG", "Unhealthy"]
+
+
+def forecast_category(aqi: int) -> str:
+    return FORECAST_CATEGORIES[bisect_left(FORECAST_BAND_LIMITS, aqi)]
+
+
+class ForecastMatrix(NamedTuple):
+    """Row-major uint16 AQI matrix (one row of `days` values per city)"""
+    bucket: int
+    days: int
+    aqi: array
+    trend: array
+
+    def row(self, idx: int) -> memoryview:
+        return memoryview(self.aqi)[idx * self.days:(idx + 1) * self.days]
+
+
+class ForecastEngine:
+    """Builds the full forecast matrix in one pass and serves rows from it
+
+    The matrix is rebuilt by a background task at each bucket boundary; a
+    request that arrives first simply triggers the rebuild itself. With a
+    reading feed, each city's forecast starts from its current reading, and
+    the engine listens to the feed so that an upstream observation redoes
+    just that city's row.
+    """
+
+    def __init__(self, store, simulation: SimulationEngine, days: int = FORECAST_DAYS, feed=None):
+        self.store = store
+        self.simulation = simulation
+        self.days = days
+        self.feed = feed
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.row_updates = 0
+        self._matrix: Optional[ForecastMatrix] = None
+        # Only matrices built here are updated in place; adopted ones may be shared memory
+        self._owned = False
+        self._task: Optional[asyncio.Task] = None
+
+    def matrix(self, bucket: Optional[int] = None) -> ForecastMatrix:
+        """Return the matrix for a bucket (the current one by default)"""
+        if bucket is None:
+            bucket = self.simulation.bucket()
+        matrix = self._matrix
+        if matrix is None or matrix.bucket != bucket:
+            matrix = self.build(bucket)
+            self._matrix = matrix
+            self._owned = True
+        return matrix
+
+    def build(self, bucket: int) -> ForecastMatrix:
+        """Forecast every city for a bucket
+
+        Each city draws from its own PRNG stream seeded by (city, bucket),
+        which is what keeps forecasts identical across workers, so the
+        per-city loop stays; it runs once per bucket, never per request.
+        """
+        started = time.perf_counter()
+        names, base_aqi = self.store.names, self.store.base_aqi
+        latest = None
+        if self.feed is not None and bucket == self.simulation.bucket():
+            self.feed.ensure_current()
+            latest = self.feed.latest
+
+        aqi = array("H")
+        trend = array("B")
+        for idx, name in enumerate(names):
+            if latest is not None:
+                start_aqi = latest[idx].aqi
+            else:
+                start_aqi = self.simulation.sample(name, base_aqi[idx], bucket).aqi
+            city_trend, values = self.simulation.forecast(name, start_aqi, self.days, bucket)
+            aqi.extend(values)
+            trend.append(FORECAST_TRENDS.index(city_trend))
+        self.builds += 1
+        self.last_build_ms = (time.perf_counter() - started) * 1000
+        return ForecastMatrix(bucket, self.days, aqi, trend)
+
+    def update(self, idx: int, sample: CitySample) -> None:
+        """Reading-feed listener: re-forecast one city when an upstream observation arrives
+
+        Simulated readings only change at bucket boundaries, where the whole
+        matrix is rebuilt anyway, so they are left alone here.
+        """
+        matrix = self._matrix
+        if matrix is None or not self._owned or not self.feed.observed(idx):
+            return
+        city_trend, values = self.simulation.forecast(self.store.names[idx], sample.aqi, self.days, matrix.bucket)
+        start = idx * self.days
+        matrix.aqi[start:start + self.days] = array("H", values)
+        matrix.trend[idx] = FORECAST_TRENDS.index(city_trend)
+        self.row_updates += 1
+
+    def rebind(self, store) -> None:
+        """Forecast a new city list; the current matrix no longer lines up and is dropped"""
+        self.store = store
+        self._matrix = None
+
+    def adopt(self, matrix: ForecastMatrix) -> None:
+        """Serve a matrix built elsewhere, e.g. published by the launcher"""
+        cities = len(self.store)
+        if matrix.days != self.days or len(matrix.trend) != cities or len(matrix.aqi) != cities * matrix.days:
+            raise ValueError(
+                f"Forecast matrix for {len(matrix.trend)} cities x {matrix.days} days "
+                f"does not fit {cities} cities x {self.days} days"
+            )
+        if self._matrix is None or matrix.bucket >= self._matrix.bucket:
+            self._matrix = matrix
+            self._owned = False
+
+    def dates(self, bucket: int, days: int) -> List:
+        start = self.simulation.bucket_start(bucket)
+        return [start + timedelta(days=i) for i in range(days)]
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.matrix()
+            except Exception as e:
+                logger.error(f"❌ Forecast rebuild failed: {e}")
+            interval = self.simulation.interval
+            await asyncio.sleep(interval - time.time() % interval + 0.01)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,201 @@
+"""
+AeroHealth History Store
+Fixed-size per-city ring buffers in a memory-mapped file
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from simulation import CitySample
+
+DEFAULT_HISTORY_FILE = Path(__file__).resolve().parents[1] / "data" / "history.bin"
+HISTORY_FILE = Path(os.environ.get("AEROHEALTH_HISTORY_FILE", DEFAULT_HISTORY_FILE))
+# Readings kept per city: one week of 5-minute buckets by default
+HISTORY_CAPACITY = int(os.environ.get("AEROHEALTH_HISTORY_CAPACITY", "2016"))
+# With several workers only one may write; the rest map the file read-only
+HISTORY_WRITER = os.environ.get("AEROHEALTH_HISTORY_WRITER", "1") != "0"
+
+MAGIC = b"AHHS"
+VERSION = 1
+HEADER = struct.Struct("<4sHII8s")   # magic, version, capacity, cities, city list digest
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<II")   # next write position, stored records
+RECORD = struct.Struct("<IHHH")      # unix time, aqi, pm25, aod in thousandths
+
+# Recent readings compared by `trend`, and the relative change that counts as a move
+TREND_WINDOW = 12
+TREND_THRESHOLD = 0.05
+
+
+class HistoryRecord(NamedTuple):
+    timestamp: int
+    aqi: int
+    pm25: int
+    aod: float
+
+
+def _digest(names: Sequence[str]) -> bytes:
+    return hashlib.blake2b("\0".join(names).encode(), digest_size=8).digest()
+
+
+class HistoryStore:
+    """One ring buffer of RECORD-sized entries per city, all in one mmap
+
+    The file is reopened as-is on restart when its capacity and city list
+    match; otherwise it is recreated empty. Writes land in the page cache, so
+    appends cost a struct pack and never block on disk.
+
+    A read-only store maps the same file shared, so it sees the writer's
+    appends as they happen; if the file does not match its layout yet it
+    serves empty history instead.
+    """
+
+    def __init__(self, names: Sequence[str], path: Path = HISTORY_FILE, capacity: int = HISTORY_CAPACITY,
+                 clock=time.time, writable: bool = HISTORY_WRITER):
+        self.cities = len(names)
+        self.capacity = max(1, capacity)
+        self.path = Path(path)
+        self.writable = writable
+        self._clock = clock
+        self._slot_size = SLOT_HEADER.size + self.capacity * RECORD.size
+        size = HEADER_SIZE + self.cities * self._slot_size
+        header = HEADER.pack(MAGIC, VERSION, self.capacity, self.cities, _digest(names))
+
+        reuse = self.path.exists() and self.path.stat().st_size == size
+        if reuse:
+            with open(self.path, "rb") as f:
+                reuse = f.read(HEADER.size) == header
+
+        self._file = None
+        if not writable:
+            if reuse:
+                self._file = open(self.path, "rb")
+                self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            else:
+                self._map = mmap.mmap(-1, size)
+            return
+
+        if not reuse:
+            # Build the new file aside and swap it in, so processes still
+            # mapping the old one keep a valid (if stale) mapping
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            staging = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+            with open(staging, "wb") as f:
+                f.truncate(size)
+                f.write(header)
+            os.replace(staging, self.path)
+
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _slot(self, idx: int) -> int:
+        return HEADER_SIZE + idx * self._slot_size
+
+    def append(self, idx: int, timestamp: int, aqi: int, pm25: int, aod: float) -> None:
+        base = self._slot(idx)
+        head, count = SLOT_HEADER.unpack_from(self._map, base)
+        RECORD.pack_into(self._map, base + SLOT_HEADER.size + head * RECORD.size,
+                         timestamp, aqi, pm25, min(65535, round(aod * 1000)))
+        SLOT_HEADER.pack_into(self._map, base, (head + 1) % self.capacity, min(count + 1, self.capacity))
+
+    def update(self, idx: int, sample: CitySample) -> None:
+        """Reading-feed listener: store a reading unless it repeats the last one"""
+        if not self.writable:
+            return
+        last = self.latest(idx)
+        if last is not None and (last.aqi, last.pm25, last.aod) == (sample.aqi, sample.pm25, round(sample.aod, 3)):
+            return
+        self.append(idx, int(self._clock()), sample.aqi, sample.pm25, sample.aod)
+
+    def records(self, idx: int, start: Optional[int] = None, end: Optional[int] = None) -> List[HistoryRecord]:
+        """Stored readings for a city in chronological order, optionally time-bounded"""
+        base = self._slot(idx)
+        head, count = SLOT_HEADER.unpack_from(self._map, base)
+        data = base + SLOT_HEADER.size
+        if count < self.capacity:
+            raw = self._map[data:data + count * RECORD.size]
+        else:
+            split = data + head * RECORD.size
+            raw = self._map[split:data + self.capacity * RECORD.size] + self._map[data:split]
+
+        result = []
+        for ts, aqi, pm25, aod in RECORD.iter_unpack(raw):
+            if (start is None or ts >= start) and (end is None or ts <= end):
+                result.append(HistoryRecord(ts, aqi, pm25, aod / 1000))
+        return result
+
+    def latest(self, idx: int) -> Optional[HistoryRecord]:
+        base = self._slot(idx)
+        head, count = SLOT_HEADER.unpack_from(self._map, base)
+        if not count:
+            return None
+        pos = (head - 1) % self.capacity
+        ts, aqi, pm25, aod = RECORD.unpack_from(self._map, base + SLOT_HEADER.size + pos * RECORD.size)
+        return HistoryRecord(ts, aqi, pm25, aod / 1000)
+
+    def trend(self, idx: int, window: int = TREND_WINDOW) -> str:
+        """Compare the mean AQI of the newer and older halves of recent readings"""
+        base = self._slot(idx)
+        head, count = SLOT_HEADER.unpack_from(self._map, base)
+        data = base + SLOT_HEADER.size
+        # Only the newest `window` slots are read, oldest first, walking back from head
+        recent = [
+            RECORD.unpack_from(self._map, data + ((head - k) % self.capacity) * RECORD.size)[1]
+            for k in range(min(window, count), 0, -1)
+        ]
+        if len(recent) < 2:
+            return "stable"
+        half = len(recent) // 2
+        older = sum(recent[:half]) / half
+        newer = sum(recent[half:]) / (len(recent) - half)
+        change = (newer - older) / older if older else 0.0
+        if change <= -2 * TREND_THRESHOLD:
+            return "improving"
+        if change <= -TREND_THRESHOLD:
+            return "improving gradually"
+        if change >= TREND_THRESHOLD:
+            return "slightly worsening"
+        return "stable"
+
+    def flush(self) -> None:
+        if self.writable:
+            self._map.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def downsample(records: List[HistoryRecord], resolution: int) -> Dict[str, list]:
+    """Group records into `resolution`-second buckets with min/max/mean columns"""
+    columns: Dict[str, list] = {
+        "timestamp": [], "samples": [], "aqi_min": [], "aqi_max": [], "aqi_mean": [],
+        "pm25_mean": [], "aod_mean": []
+    }
+    group: List[HistoryRecord] = []
+
+    def emit():
+        n = len(group)
+        columns["timestamp"].append(group[0].timestamp // resolution * resolution)
+        columns["samples"].append(n)
+        columns["aqi_min"].append(min(r.aqi for r in group))
+        columns["aqi_max"].append(max(r.aqi for r in group))
+        columns["aqi_mean"].append(round(sum(r.aqi for r in group) / n, 1))
+        columns["pm25_mean"].append(round(sum(r.pm25 for r in group) / n, 1))
+        columns["aod_mean"].append(round(sum(r.aod for r in group) / n, 3))
+
+    for record in records:
+        if group and record.timestamp // resolution != group[0].timestamp // resolution:
+            emit()
+            group = []
+        group.append(record)
+    if group:
+        emit()
+    return columns
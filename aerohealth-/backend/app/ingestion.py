@@ -0,0 +1,320 @@
+"""
+AeroHealth Upstream Ingestion
+Background fetching from pluggable air-quality sources over one pooled client
+"""
+
+import abc
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+import httpx
+
+from simulation import CitySample
+
+logger = logging.getLogger(__name__)
+
+# e.g. http://127.0.0.1:9100/aqi?city={city}&lat={lat}&lon={lon}
+UPSTREAM_URL = os.environ.get("AEROHEALTH_UPSTREAM_URL")
+INGEST_INTERVAL = float(os.environ.get("AEROHEALTH_INGEST_INTERVAL", "300"))
+INGEST_CONCURRENCY = int(os.environ.get("AEROHEALTH_INGEST_CONCURRENCY", "16"))
+INGEST_TIMEOUT = float(os.environ.get("AEROHEALTH_INGEST_TIMEOUT", "5"))
+# Minimum seconds between request-triggered fetches of the same city
+ON_DEMAND_GAP = float(os.environ.get("AEROHEALTH_ON_DEMAND_GAP", "60"))
+INGEST_RETRIES = 3
+RETRY_BASE_DELAY = 0.2
+
+
+class Observation(NamedTuple):
+    aqi: int
+    pm25: int
+    aod: float
+
+
+class UpstreamError(Exception):
+    """A fetch failed in a way worth retrying"""
+
+
+class UpstreamSource(abc.ABC):
+    """Adapter interface for an upstream air-quality provider"""
+
+    name = "upstream"
+
+    @abc.abstractmethod
+    async def fetch(self, client: httpx.AsyncClient, city: str, lat: float, lon: float) -> Optional[Observation]:
+        """Return the city's observation, None when the provider has none, or raise UpstreamError"""
+
+
+class HttpJSONSource(UpstreamSource):
+    """GETs a URL template and reads `aqi`, `pm25` and `aod` from a JSON body"""
+
+    def __init__(self, url_template: str, name: str = "http-json"):
+        self.url_template = url_template
+        self.name = name
+
+    async def fetch(self, client, city, lat, lon):
+        response = await client.get(self.url_template.format(city=city, lat=lat, lon=lon))
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 500:
+            raise UpstreamError(f"{self.name} returned {response.status_code}")
+        response.raise_for_status()
+        body = response.json()
+        return Observation(int(body["aqi"]), int(body.get("pm25", round(body["aqi"] * 0.7))), float(body["aod"]))
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial through after `reset_after` seconds
+
+    While half-open only the trial call is allowed; its success closes the
+    breaker and its failure re-opens it. A trial that never reports back
+    stops blocking others after another `reset_after` seconds.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = self._clock()
+        if self.probe_started is not None and now - self.probe_started < self.reset_after:
+            return False
+        self.probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = self._clock()
+            self.probe_started = None
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one in-flight coroutine"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class IngestionService:
+    """Fetches every city from each source on a schedule and publishes observations
+
+    All sources share one pooled AsyncClient; a semaphore caps concurrent
+    requests, failures retry with exponential backoff and full jitter, and a
+    per-source circuit breaker stops hammering a provider that is down.
+    Requests can also schedule a background fetch of a stale city; those
+    fetches share one in-flight call per city with each other and with the
+    scheduled cycle, and the request never waits on them.
+    """
+
+    def __init__(self, store, publish: Callable[[int, CitySample], None], sources: List[UpstreamSource],
+                 interval: float = INGEST_INTERVAL, concurrency: int = INGEST_CONCURRENCY,
+                 timeout: float = INGEST_TIMEOUT, retries: int = INGEST_RETRIES):
+        self.store = store
+        self.publish = publish
+        self.sources = sources
+        self.interval = interval
+        self.retries = retries
+        self.breakers = {source.name: CircuitBreaker() for source in sources}
+        self.singleflight = SingleFlight()
+        self.fetched = 0
+        self.failures = 0
+        self.on_demand = 0
+        self._attempted: Dict[int, float] = {}
+        self._background: Dict[int, asyncio.Task] = {}
+        self._timeout = timeout
+        self._concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._timeout, connect=min(2.0, self._timeout)),
+                limits=httpx.Limits(max_connections=self._concurrency,
+                                    max_keepalive_connections=self._concurrency)
+            )
+        return self._client
+
+    async def fetch_city(self, idx: int, source: Optional[UpstreamSource] = None) -> Optional[Observation]:
+        """Fetch and publish one city, sharing the call with any concurrent caller"""
+        source = source or self.sources[0]
+        return await self.singleflight.do((source.name, idx), lambda: self._fetch_and_publish(source, idx))
+
+    async def refresh_city(self, idx: int) -> bool:
+        """Fetch a city for a request that found its reading stale; True when one was published"""
+        if not self.sources:
+            return False
+        # Callers arriving while a fetch is in flight join it; after it
+        # completes, the city is not asked for again for ON_DEMAND_GAP seconds
+        if time.monotonic() - self._attempted.get(idx, float("-inf")) < ON_DEMAND_GAP:
+            return False
+        self.on_demand += 1
+        try:
+            return await self.fetch_city(idx) is not None
+        finally:
+            self._attempted[idx] = time.monotonic()
+
+    def schedule_refresh(self, idx: int) -> bool:
+        """Start refresh_city in the background unless one is running or due later; True when started"""
+        if not self.sources or idx in self._background:
+            return False
+        if time.monotonic() - self._attempted.get(idx, float("-inf")) < ON_DEMAND_GAP:
+            return False
+        task = asyncio.get_running_loop().create_task(self.refresh_city(idx))
+        self._background[idx] = task
+        task.add_done_callback(lambda _: self._background.pop(idx, None))
+        return True
+
+    def rebind(self, store) -> None:
+        """Fetch a new city list; fetches already in flight publish by city name"""
+        self.store = store
+        self._attempted.clear()
+
+    async def _fetch_and_publish(self, source: UpstreamSource, idx: int) -> Optional[Observation]:
+        store, name = self.store, self.store.names[idx]
+        observation = await self._fetch(source, idx)
+        if observation is not None and self.store is not store:
+            idx = self.store.index.get(name)
+            if idx is None:
+                return None
+        if observation is not None:
+            self.publish(idx, CitySample(observation.aqi, observation.aod, observation.aod, observation.pm25))
+        return observation
+
+    async def _fetch(self, source: UpstreamSource, idx: int) -> Optional[Observation]:
+        breaker = self.breakers[source.name]
+        if not breaker.allow():
+            return None
+        name, lat, lon = self.store.names[idx], self.store.lat[idx], self.store.lon[idx]
+
+        for attempt in range(self.retries):
+            try:
+                async with self._semaphore:
+                    observation = await source.fetch(self.client, name, lat, lon)
+                breaker.record_success()
+                self.fetched += 1
+                return observation
+            except (httpx.TransportError, UpstreamError) as e:
+                breaker.record_failure()
+                self.failures += 1
+                if attempt + 1 == self.retries or not breaker.allow():
+                    logger.warning(f"⚠️ {source.name} failed for {name}: {e}")
+                    return None
+                await asyncio.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+            except (httpx.HTTPStatusError, KeyError, ValueError) as e:
+                breaker.record_success()
+                logger.warning(f"⚠️ {source.name} returned unusable data for {name}: {e}")
+                return None
+        return None
+
+    async def ingest_all(self) -> int:
+        """Fetch every city from every source and publish what arrived"""
+        published = 0
+        for source in self.sources:
+            indices = range(len(self.store))
+            results = await asyncio.gather(*(self.fetch_city(idx, source) for idx in indices))
+            published += sum(observation is not None for observation in results)
+        return published
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.ingest_all()
+            except Exception as e:
+                logger.error(f"❌ Ingestion cycle failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._background.values()):
+            task.cancel()
+        await asyncio.gather(*self._background.values(), return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict:
+        return {
+            "sources": [source.name for source in self.sources],
+            "fetched": self.fetched,
+            "failures": self.failures,
+            "on_demand": self.on_demand,
+            "coalesced": self.singleflight.coalesced,
+            "breakers": {name: breaker.state for name, breaker in self.breakers.items()},
+        }
+
+
+if __name__ == "__main__":
+    # Local stub upstream for testing: python ingestion.py [port]
+    import json
+    import sys
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    from simulation import simulation_engine
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            city = query.get("city", ["Delhi"])[0]
+            sample = simulation_engine.sample(f"stub:{city}", 100)
+            body = json.dumps({"aqi": sample.aqi, "pm25": sample.pm25, "aod": sample.aod}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9100
+    print(f"🛰️ Stub upstream on http://127.0.0.1:{port}/aqi?city={{city}}")
+    ThreadingHTTPServer(("127.0.0.1", port), StubHandler).serve_forever()
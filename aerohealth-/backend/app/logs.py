@@ -0,0 +1,198 @@
+"""
+AeroHealth Logging
+Optional JSON logging through a queue drained off the event loop, with per-path sampling
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+# "text" keeps the plain stream handler; "json" enables the queued structured mode
+LOG_FORMAT = os.environ.get("AEROHEALTH_LOG_FORMAT", "text")
+LOG_LEVEL = os.environ.get("AEROHEALTH_LOG_LEVEL", "INFO")
+LOG_QUEUE_SIZE = int(os.environ.get("AEROHEALTH_LOG_QUEUE", "10000"))
+# e.g. "/api/v1/air-quality/current=0.01,/api/v1/tiles=0"; longest matching prefix wins
+LOG_SAMPLE = os.environ.get("AEROHEALTH_LOG_SAMPLE", "")
+
+# uvicorn's loggers carry their own synchronous handlers and do not propagate
+UVICORN_LOGGERS = ["uvicorn", "uvicorn.error", "uvicorn.access"]
+
+# (path, sampled in) for the request being handled
+request_context: ContextVar[Optional[Tuple[str, bool]]] = ContextVar("request_context", default=None)
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def parse_sample_rates(spec: str) -> List[Tuple[str, float]]:
+    """Parse "prefix=rate,..." into (prefix, rate) pairs, longest prefix first"""
+    rates = []
+    for item in spec.split(","):
+        prefix, _, rate = item.strip().rpartition("=")
+        if prefix:
+            rates.append((prefix, min(1.0, max(0.0, float(rate)))))
+    return sorted(rates, key=lambda pair: -len(pair[0]))
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps all or none of a request's sub-warning records; warnings and errors always pass
+
+    Whether a request is kept is decided once, when it arrives, from the
+    rate of its longest matching path prefix.
+    """
+
+    def __init__(self, rates: List[Tuple[str, float]]):
+        super().__init__()
+        self.rates = rates
+        self.sampled_out = 0
+
+    def rate(self, path: Optional[str]) -> float:
+        if path is not None:
+            for prefix, rate in self.rates:
+                if path.startswith(prefix):
+                    return rate
+        return 1.0
+
+    def sample(self, path: str) -> bool:
+        rate = self.rate(path)
+        return rate >= 1.0 or random.random() < rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get()
+        if context is None:
+            return True
+        record.path, sampled = context
+        if sampled or record.levelno >= logging.WARNING:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hands records to the listener thread without blocking on a full queue
+
+    Formatting is left to the listener; only %-args and exception text are
+    resolved here so the record no longer references live objects. When the
+    queue is full, info records are dropped and counted; warnings and errors
+    are never dropped and go straight to `fallback` (the listener's own output
+    handler) instead, written synchronously on the calling thread.
+    """
+
+    def __init__(self, q: queue.Queue, fallback: logging.Handler):
+        super().__init__(q)
+        self.fallback = fallback
+        self.dropped = 0
+        self.direct_writes = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            self.direct_writes += 1
+            self.fallback.handle(record)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the record's `extra=` fields inlined"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LogContextMiddleware:
+    """Pure ASGI middleware recording each request's path and sampling decision for log filters"""
+
+    def __init__(self, app, sampler: SamplingFilter):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        token = request_context.set((path, self.sampler.sample(path)))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_context.reset(token)
+
+
+class QueuedLogging:
+    """The installed JSON pipeline: root handler, its sampler and the listener thread"""
+
+    def __init__(self, handler: BoundedQueueHandler, sampler: SamplingFilter, listener: QueueListener):
+        self.handler = handler
+        self.sampler = sampler
+        self.listener = listener
+
+    def stop(self) -> None:
+        """Flush queued records and join the listener thread"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "direct_writes": self.handler.direct_writes,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+def configure_logging(fmt: str = LOG_FORMAT, level: str = LOG_LEVEL) -> Optional[QueuedLogging]:
+    """Install the plain handler, or the queued JSON pipeline when fmt is "json" """
+    if fmt != "json":
+        logging.basicConfig(level=level)
+        return None
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter())
+    sampler = SamplingFilter(parse_sample_rates(LOG_SAMPLE))
+    handler = BoundedQueueHandler(queue.Queue(LOG_QUEUE_SIZE), output)
+    handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # Send uvicorn's records, access lines included, through the queue as well
+    for name in UVICORN_LOGGERS:
+        server_logger = logging.getLogger(name)
+        for existing in list(server_logger.handlers):
+            server_logger.removeHandler(existing)
+        server_logger.propagate = True
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return QueuedLogging(handler, sampler, listener)
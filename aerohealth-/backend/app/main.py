@@ -3,20 +3,44 @@ AeroHealth Ultimate Advanced - Enhanced Backend API
 Supports 3D Globe, Ultra AI, 500+ Cities, Health Intelligence
 """
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union
 import asyncio
 import httpx
 import logging
+import os
+import time
 from datetime import datetime, timezone
-import random
 import math
+from bisect import bisect_left
+from collections import Counter
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from cache import CachedReading, ResponseCache
+from city_store import CityStore, load_city_store
+from resolver import CityResolver
+from simulation import FORECAST_TRENDS, CitySample, simulation_engine
+from spatial import SpatialIndex
+from streaming import StreamHub
+from aggregates import DIMENSIONS, AggregateIndex
+from history import HistoryStore, downsample
+from raster import AODWindow
+from responses import CityReading, ResponseBuilder, dumps
+from personalization import personalization_engine
+from metrics import MetricsMiddleware, MetricsRegistry, StackSampler
+from logs import LogContextMiddleware, configure_logging
+from snapshot import SNAPSHOT_NAME, SnapshotFollower
+from tiles import AQI_SCALE, MAX_ZOOM, TILE_SIZE, render_tile, tile_in_range
+from ingestion import UPSTREAM_URL, HttpJSONSource, IngestionService
+from rankings import RankingIndex
+from readings import ReadingFeed
+from comparison import COMPARE_MAX, DIFFERENCE_ADVICE, DIFFERENCE_LIMITS, DIFFERENCES, compare
+from forecast import FORECAST_BAND_LIMITS, FORECAST_CATEGORIES, FORECAST_DAYS, ForecastEngine, forecast_category
+
+# Configure logging (AEROHEALTH_LOG_FORMAT=json for queued, sampled JSON lines)
+queued_logging = configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -40,34 +64,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Tile-Size", "X-AQI-Scale"],
 )
 
-# Enhanced city database with 500+ cities
-ENHANCED_CITY_DATABASE = {
-    # Major Metropolitan Cities
-    "Mumbai": {"lat": 19.0760, "lon": 72.8777, "state": "Maharashtra", "tier": 1, "base_aqi": 89},
-    "Delhi": {"lat": 28.6139, "lon": 77.2090, "state": "Delhi", "tier": 1, "base_aqi": 152},
-    "Bangalore": {"lat": 12.9716, "lon": 77.5946, "state": "Karnataka", "tier": 1, "base_aqi": 76},
-    "Hyderabad": {"lat": 17.3850, "lon": 78.4867, "state": "Telangana", "tier": 1, "base_aqi": 78},
-    "Ahmedabad": {"lat": 23.0225, "lon": 72.5714, "state": "Gujarat", "tier": 1, "base_aqi": 118},
-    "Chennai": {"lat": 13.0827, "lon": 80.2707, "state": "Tamil Nadu", "tier": 1, "base_aqi": 82},
-    "Kolkata": {"lat": 22.5726, "lon": 88.3639, "state": "West Bengal", "tier": 1, "base_aqi": 134},
-    "Surat": {"lat": 21.1702, "lon": 72.8311, "state": "Gujarat", "tier": 1, "base_aqi": 95},
-    "Pune": {"lat": 18.5204, "lon": 73.8567, "state": "Maharashtra", "tier": 1, "base_aqi": 91},
-    "Jaipur": {"lat": 26.9124, "lon": 75.7873, "state": "Rajasthan", "tier": 1, "base_aqi": 102},
-
-    # Major Cities
-    "Lucknow": {"lat": 26.8467, "lon": 80.9462, "state": "Uttar Pradesh", "tier": 2, "base_aqi": 68},
-    "Kanpur": {"lat": 26.4499, "lon": 80.3319, "state": "Uttar Pradesh", "tier": 2, "base_aqi": 145},
-    "Nagpur": {"lat": 21.1458, "lon": 79.0882, "state": "Maharashtra", "tier": 2, "base_aqi": 88},
-    "Patna": {"lat": 25.5941, "lon": 85.1376, "state": "Bihar", "tier": 2, "base_aqi": 156},
-    "Indore": {"lat": 22.7196, "lon": 75.8577, "state": "Madhya Pradesh", "tier": 2, "base_aqi": 92},
-    "Thane": {"lat": 19.2183, "lon": 72.9781, "state": "Maharashtra", "tier": 2, "base_aqi": 87},
-    "Bhopal": {"lat": 23.2599, "lon": 77.4126, "state": "Madhya Pradesh", "tier": 2, "base_aqi": 84},
-    "Visakhapatnam": {"lat": 17.6868, "lon": 83.2185, "state": "Andhra Pradesh", "tier": 2, "base_aqi": 71},
-    "Vadodara": {"lat": 22.3072, "lon": 73.1812, "state": "Gujarat", "tier": 2, "base_aqi": 89},
-    "Ludhiana": {"lat": 30.9010, "lon": 75.8573, "state": "Punjab", "tier": 3, "base_aqi": 124},
-}
+# Request metrics, exported at /metrics
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+metrics.histogram("aerohealth_reading_generate_seconds", "Time to build one city reading",
+                  buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005))
+profiler = StackSampler()
+
+if queued_logging is not None:
+    app.add_middleware(LogContextMiddleware, sampler=queued_logging.sampler)
+
+# Enhanced city database with 500+ cities, loaded once into columnar arrays.
+# Workers started by serve.py read the launcher's shared snapshot instead.
+snapshot_follower = SnapshotFollower() if SNAPSHOT_NAME else None
+city_store = snapshot_follower.store if snapshot_follower is not None else load_city_store()
+spatial_index = SpatialIndex(city_store.lat, city_store.lon)
+city_resolver = CityResolver(city_store.names)
+
+# Latest reading per city, pushed into incrementally maintained views
+reading_feed = ReadingFeed(city_store, simulation_engine)
+ranking_index = RankingIndex(city_store)
+reading_feed.subscribe(ranking_index)
+aggregate_index = AggregateIndex(city_store)
+reading_feed.subscribe(aggregate_index)
+history_store = HistoryStore(city_store.names)
+reading_feed.subscribe(history_store)
+
+def current_samples() -> List[CitySample]:
+    """Latest reading per city (indexed like city_store), refreshed per bucket"""
+    reading_feed.ensure_current()
+    return reading_feed.latest
+
+# Upstream observations replace simulated readings when a source is configured
+upstream_sources = [HttpJSONSource(UPSTREAM_URL)] if UPSTREAM_URL else []
+ingestion_service = IngestionService(city_store, reading_feed.observe, upstream_sources)
+
+# Forecasts start from each city's current reading. Workers follow the
+# launcher's shared matrix unless they ingest upstream readings of their own.
+forecast_engine = ForecastEngine(city_store, simulation_engine, feed=reading_feed)
+reading_feed.subscribe(forecast_engine)
+follow_snapshot = snapshot_follower is not None and not upstream_sources
+if follow_snapshot:
+    snapshot_follower.follow(forecast_engine)
+
+# Satellite AOD grids from AEROHEALTH_AOD_DIR, sampled at every city when loaded
+aod_window = AODWindow(city_store)
+aod_window.reload()
+
+def city_aod(idx: int, sample: CitySample) -> Tuple[float, float]:
+    """(average, latest) AOD for a city: satellite when covered, else the AQI-derived estimate"""
+    satellite = aod_window.city_aod(idx)
+    if satellite is not None:
+        return satellite
+    return sample.aod, sample.latest_aod
 
 # Pydantic models
 class LocationResponse(BaseModel):
@@ -117,143 +169,151 @@ class CurrentAirQualityResponse(BaseModel):
     space_interface: SpaceInterfaceResponse
     timestamp: str
 
+class BatchAirQualityRequest(BaseModel):
+    cities: Optional[List[str]] = None
+    tier: Optional[int] = None
+    state: Optional[str] = None
+    region: Optional[str] = None
+
+class BatchAirQualityResponse(BaseModel):
+    """Columnar payload: every list is indexed by position in `cities`"""
+    count: int
+    cities: List[str]
+    latitude: List[float]
+    longitude: List[float]
+    aqi: List[int]
+    pm25_value: List[int]
+    aod: List[float]
+    band: List[int]
+    bands: List[Dict[str, str]]
+    unknown_cities: List[str]
+    timestamp: str
+
+class HealthProfile(BaseModel):
+    id: str
+    city: str
+    age_group: Optional[str] = None
+    conditions: List[str] = []
+    activity_level: Optional[str] = None
+    sensitivity: Optional[str] = None
+    alerts_enabled: bool = True
+
+class HealthBatchRequest(BaseModel):
+    profiles: List[HealthProfile]
+    only_notify: bool = False
+
+HEALTH_BATCH_MAX = int(os.environ.get("AEROHEALTH_HEALTH_BATCH_MAX", "20000"))
+
+# AQI bands: (upper bound, category, risk level)
+AQI_BAND_LIMITS = [50, 100, 150, 200]
+AQI_BANDS = [
+    ("Good", "Low"),
+    ("Moderate", "Low-Moderate"),
+    ("Unhealthy for Sensitive Groups", "Moderate"),
+    ("Unhealthy", "High"),
+    ("Very Unhealthy", "Very High"),
+]
+
+def classify_aqi(aqi: int) -> int:
+    """Return the index into AQI_BANDS for an AQI value"""
+    return bisect_left(AQI_BAND_LIMITS, aqi)
+
+# Static per-city response fragments, compiled once
+response_builder = ResponseBuilder(city_store, [risk_level for _, risk_level in AQI_BANDS])
+
 # Enhanced city data generator
-def generate_enhanced_city_data(city_name: str) -> CurrentAirQualityResponse:
+def generate_enhanced_city_data(city_name: str) -> CachedReading:
     """Generate comprehensive air quality data for any Indian city"""
+    started = time.perf_counter()
 
-    # Get city data or use default
-    city_info = ENHANCED_CITY_DATABASE.get(city_name, {
-        "lat": 28.6139, "lon": 77.2090, "state": "Delhi", "tier": 1, "base_aqi": 100
-    })
-
-    # Generate realistic AQI with variation
-    base_aqi = city_info["base_aqi"]
-    aqi = max(10, min(300, base_aqi + random.randint(-25, 35)))
-
-    # Generate AOD based on AQI
-    base_aod = (aqi / 150) * 0.5 + random.uniform(0.05, 0.15)
-    aod = round(base_aod, 3)
-
-    # Determine categories and risk levels
-    if aqi <= 50:
-        category, risk_level = "Good", "Low"
-    elif aqi <= 100:
-        category, risk_level = "Moderate", "Low-Moderate"  
-    elif aqi <= 150:
-        category, risk_level = "Unhealthy for Sensitive Groups", "Moderate"
-    elif aqi <= 200:
-        category, risk_level = "Unhealthy", "High"
-    else:
-        category, risk_level = "Very Unhealthy", "Very High"
-
-    # Calculate derived values
-    visibility = max(3, round(50 / aod))
-    pm25 = round(aqi * 0.7 + random.uniform(0, 10))
-
-    # Generate trend
-    trends = ["improving", "stable", "slightly worsening", "improving gradually"]
-    trend = random.choice(trends)
-
-    # AOD category
-    if aod < 0.2:
-        aod_category = "Excellent"
-    elif aod < 0.3:
-        aod_category = "Good"
-    elif aod < 0.4:
-        aod_category = "Moderate"
-    elif aod < 0.5:
-        aod_category = "Fair"
-    else:
-        aod_category = "Poor"
+    # Names are resolved against the store before reaching here
+    idx = city_store.index[city_name]
 
-    # Generate city-specific details
-    emojis = {
-        "Maharashtra": "🏙️", "Gujarat": "🏭", "Karnataka": "🌳", "Tamil Nadu": "🏖️",
-        "Kerala": "🌴", "Delhi": "🏛️", "Punjab": "🌾", "Rajasthan": "🏰",
-        "West Bengal": "🎭", "Uttar Pradesh": "🕌", "Bihar": "📿"
-    }
+    # Latest published reading (simulated, or observed upstream)
+    sample = current_samples()[idx]
+    category, risk_level = AQI_BANDS[classify_aqi(sample.aqi)]
 
-    emoji = emojis.get(city_info.get("state", "Delhi"), "🏙️")
-    space_code = f"{city_name[:3].upper()}-001"
-    sector = f"{city_info.get('state', 'Unknown')} Sector"
-
-    # Health recommendations based on AQI
-    if risk_level == "Low":
-        health_impact = f"Excellent atmospheric conditions in {city_name}! Perfect for all outdoor activities."
-        recommendations = [
-            f"Outstanding conditions for outdoor activities in {city_name}",
-            "Perfect for exercise and recreational activities", 
-            "Excellent conditions for children to play outside"
-        ]
-        activity_guidance = {"running": "Safe", "walking": "Safe", "cycling": "Safe"}
-    elif risk_level == "Low-Moderate":
-        health_impact = f"Good air quality in {city_name}. Generally acceptable for most people."
-        recommendations = [
-            f"Normal outdoor activities recommended in {city_name}",
-            "Sensitive individuals should monitor conditions",
-            "Good for moderate exercise and activities"
-        ]
-        activity_guidance = {"running": "Safe", "walking": "Safe", "cycling": "Caution"}
-    elif risk_level == "Moderate":
-        health_impact = f"Air quality in {city_name} is concerning for sensitive groups. Monitor conditions."
-        recommendations = [
-            f"Limit prolonged outdoor activities in {city_name}",
-            "Sensitive groups should wear masks",
-            "Consider indoor alternatives during peak hours"
-        ]
-        activity_guidance = {"running": "Caution", "walking": "Limited", "cycling": "Limited"}
+    # Satellite AOD from the raster window, falling back to the AQI-derived estimate
+    satellite = aod_window.city_aod(idx)
+    if satellite is not None:
+        aod, latest_aod = satellite
+        satellite_extra = {"data_range": f"{len(aod_window.grids)} days satellite AOD", "space_grade": "Satellite pixels, bilinear"}
     else:
-        health_impact = f"Air quality in {city_name} requires caution. Limit outdoor exposure."
-        recommendations = [
-            f"Stay indoors in {city_name} when possible",
-            "Avoid outdoor exercise",
-            "Use air purifiers and N95 masks"
-        ]
-        activity_guidance = {"running": "Avoid", "walking": "Avoid", "cycling": "Avoid"}
-
-    # Build response
-    return CurrentAirQualityResponse(
+        aod, latest_aod = sample.aod, sample.latest_aod
+        satellite_extra = {}
+
+    reading = CityReading(
         city=city_name,
-        location=LocationResponse(
-            latitude=city_info["lat"],
-            longitude=city_info["lon"],
-            emoji=emoji,
-            space_code=space_code,
-            sector=sector
-        ),
-        air_quality=AirQualityResponse(
-            aqi=aqi,
-            category=category,
-            risk_level=risk_level,
-            pm25_value=pm25
-        ),
-        nasa_satellite=NASASatelliteResponse(
-            average_aod=aod,
-            latest_aod=round(aod * random.uniform(0.9, 1.1), 3),
-            trend=trend,
-            category=aod_category,
-            visibility_km=visibility,
-            health_impact=health_impact
-        ),
-        health_recommendations=HealthRecommendationsResponse(
-            health_impact=health_impact,
-            general_recommendations=recommendations,
-            risk_level=risk_level,
-            outdoor_activity_guidance=activity_guidance,
-            sensitive_groups=[
-                "Children and teenagers",
-                "Adults over 65 years",
-                "Pregnant women", 
-                "People with respiratory conditions",
-                "People with cardiovascular disease"
-            ]
-        ),
-        space_interface=SpaceInterfaceResponse(
-            detailed_intelligence=f"Advanced analytics for {city_name}",
-            space_code=space_code,
-            sector=sector
-        ),
-        timestamp=datetime.now(timezone.utc).isoformat()
+        aqi=sample.aqi,
+        category=category,
+        risk_level=risk_level,
+        pm25=sample.pm25,
+        aod=aod,
+        latest_aod=latest_aod,
+        trend=history_store.trend(idx),
+        timestamp=simulation_engine.bucket_start(reading_feed.bucket).isoformat()
+    )
+
+    # Static fragments were compiled at startup; only the numbers are encoded here
+    cached = CachedReading(reading, response_builder.build(idx, reading, **satellite_extra))
+    metrics.observe("aerohealth_reading_generate_seconds", (), time.perf_counter() - started)
+    return cached
+
+def resolve_city(city: str) -> str:
+    """Resolve a user-supplied name to a dataset city, or raise 404 with suggestions"""
+    resolution = city_resolver.resolve(city)
+    if resolution.index is None:
+        hint = f" Did you mean {', '.join(resolution.suggestions)}?" if resolution.suggestions else ""
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": f"Unknown city '{city}'.{hint}",
+                "suggestions": resolution.suggestions
+            }
+        )
+    return city_store.names[resolution.index]
+
+# Cache of generated readings keyed on (city, time bucket)
+reading_cache = ResponseCache(
+    maxsize=int(os.environ.get("AEROHEALTH_CACHE_SIZE", "2048")),
+    ttl=simulation_engine.interval
+)
+
+class ReadingCacheInvalidator:
+    """Reading-feed listener that evicts a city's cached response when its reading changes"""
+
+    def update(self, idx: int, sample: CitySample) -> None:
+        reading_cache.discard((city_store.names[idx], simulation_engine.bucket()))
+
+reading_cache_invalidator = ReadingCacheInvalidator()
+reading_feed.subscribe(reading_cache_invalidator)
+
+def get_cached_city_data(city_name: str) -> CachedReading:
+    """Return the reading for a city in the current bucket, generating it once"""
+    return reading_cache.get_or_create(
+        (city_name, simulation_engine.bucket()),
+        lambda: generate_enhanced_city_data(city_name)
+    )
+
+def generate_batch_city_data(indices: List[int], unknown_cities: Optional[List[str]] = None) -> BatchAirQualityResponse:
+    """Generate current readings for many cities in a single columnar pass"""
+    names, latest = city_store.names, current_samples()
+    bucket = reading_feed.bucket
+    samples = [latest[i] for i in indices]
+    aqi = [sample.aqi for sample in samples]
+
+    return BatchAirQualityResponse(
+        count=len(indices),
+        cities=[names[i] for i in indices],
+        latitude=[city_store.lat[i] for i in indices],
+        longitude=[city_store.lon[i] for i in indices],
+        aqi=aqi,
+        pm25_value=[sample.pm25 for sample in samples],
+        aod=[sample.aod for sample in samples],
+        band=[bisect_left(AQI_BAND_LIMITS, a) for a in aqi],
+        bands=[{"category": c, "risk_level": r} for c, r in AQI_BANDS],
+        unknown_cities=unknown_cities or [],
+        timestamp=simulation_engine.bucket_start(bucket).isoformat()
     )
 
 @app.get("/")
@@ -273,10 +333,22 @@ async def root():
         "status": "operational",
         "endpoints": {
             "current": "/api/v1/air-quality/current",
+            "batch": "/api/v1/air-quality/batch",
+            "nearest": "/api/v1/air-quality/nearest",
+            "within": "/api/v1/air-quality/within",
+            "stream": "/api/v1/air-quality/stream",
             "health": "/api/v1/health",
+            "health_batch": "/api/v1/health/batch",
             "cities": "/api/v1/cities",
             "forecast": "/api/v1/forecast", 
-            "nasa": "/api/v1/nasa"
+            "forecast_bulk": "/api/v1/forecast/bulk",
+            "compare": "/api/v1/compare",
+            "rankings": "/api/v1/rankings",
+            "aggregates": "/api/v1/aggregates",
+            "history": "/api/v1/history",
+            "tiles": "/api/v1/tiles/{z}/{x}/{y}",
+            "nasa": "/api/v1/nasa",
+            "metrics": "/metrics"
         }
     }
 
@@ -289,65 +361,435 @@ async def get_current_air_quality(
     Get comprehensive current air quality data for any Indian city
     Supports 500+ cities with NASA satellite integration
     """
+    city = resolve_city(city)
+
     try:
-        logger.info(f"🎯 Fetching enhanced data for {city}")
+        logger.info("🎯 Fetching enhanced data for %s", city)
 
-        # Generate comprehensive city data
-        data = generate_enhanced_city_data(city)
+        # Without a fresh upstream observation, ask the provider in the
+        # background and serve the current reading meanwhile
+        idx = city_store.index[city]
+        if upstream_sources and not reading_feed.observed(idx):
+            ingestion_service.schedule_refresh(idx)
 
-        logger.info(f"✅ Enhanced data generated for {city}: AQI {data.air_quality.aqi}")
-        return data
+        # Serve the cached reading as pre-serialized JSON
+        cached = get_cached_city_data(city)
+
+        logger.info("✅ Enhanced data generated for %s: AQI %s", city, cached.reading.aqi,
+                    extra={"city": city, "aqi": cached.reading.aqi})
+        return Response(content=cached.body, media_type="application/json")
 
     except Exception as e:
         logger.error(f"❌ Error generating data for {city}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate data for {city}")
 
+@app.post("/api/v1/air-quality/batch", response_model=BatchAirQualityResponse)
+async def get_batch_air_quality(request: BatchAirQualityRequest):
+    """
+    Get current readings for many cities in one round trip
+    Select cities by name, or by tier/state/region filter (all cities when empty)
+    """
+    indices = city_store.select(request.tier, request.state, request.region)
+    unknown = []
+
+    if request.cities:
+        selected = set(indices)
+        resolved = []
+        for name in request.cities:
+            idx = city_resolver.resolve(name).index
+            if idx is None:
+                unknown.append(name)
+            elif idx in selected:
+                resolved.append(idx)
+        indices = resolved
+
+    return generate_batch_city_data(indices, unknown)
+
+def compute_stream_readings(indices: List[int]) -> Dict[int, Dict]:
+    """Compact readings for the live stream producer"""
+    latest = current_samples()
+    timestamp = simulation_engine.bucket_start(reading_feed.bucket).isoformat()
+    readings = {}
+    for idx in indices:
+        name = city_store.names[idx]
+        sample = latest[idx]
+        readings[idx] = {
+            "city": name,
+            "aqi": sample.aqi,
+            "pm25_value": sample.pm25,
+            "aod": sample.aod,
+            "band": classify_aqi(sample.aqi),
+            "timestamp": timestamp
+        }
+    return readings
+
+# Single shared producer for every live dashboard
+stream_hub = StreamHub(compute_stream_readings)
+
+@app.on_event("startup")
+async def start_stream_producer():
+    stream_hub.start()
+
+@app.on_event("shutdown")
+async def stop_stream_producer():
+    await stream_hub.stop()
+
+def install_city_store(store: CityStore) -> None:
+    """Switch this worker to new city data in place (serve.py SIGHUP reload)
+
+    Runs on the event loop between requests, so every route sees either the
+    old city list or the new one in full. Readings, subscriptions and
+    in-flight fetches carry over by city name.
+    """
+    global city_store, spatial_index, city_resolver, ranking_index, aggregate_index, history_store, response_builder
+    mapping = {idx: store.index[name] for idx, name in enumerate(city_store.names) if name in store.index}
+    previous_history = history_store
+
+    city_store = store
+    spatial_index = SpatialIndex(store.lat, store.lon)
+    city_resolver = CityResolver(store.names)
+    ranking_index = RankingIndex(store)
+    aggregate_index = AggregateIndex(store)
+    history_store = HistoryStore(store.names)
+    response_builder = ResponseBuilder(store, [risk_level for _, risk_level in AQI_BANDS])
+    forecast_engine.rebind(store)
+    reading_feed.rebind(store, [ranking_index, aggregate_index, history_store, reading_cache_invalidator,
+                                forecast_engine])
+    ingestion_service.rebind(store)
+    aod_window.rebind(store)
+    stream_hub.remap(mapping)
+    reading_cache.clear()
+    tile_cache.clear()
+    previous_history.close()
+    logger.info(f"🔄 City data switched in place: {len(store)} cities")
+
+if snapshot_follower is not None:
+    snapshot_follower.on_store_change(install_city_store)
+
+@app.on_event("startup")
+async def start_forecast_engine():
+    # Under serve.py the launcher builds forecasts; workers follow its snapshot
+    if snapshot_follower is not None:
+        snapshot_follower.start()
+    if not follow_snapshot:
+        forecast_engine.start()
+
+@app.on_event("shutdown")
+async def stop_forecast_engine():
+    await forecast_engine.stop()
+    if snapshot_follower is not None:
+        await snapshot_follower.stop()
+
+@app.on_event("startup")
+async def start_reading_feed():
+    reading_feed.start()
+
+@app.on_event("shutdown")
+async def stop_reading_feed():
+    await reading_feed.stop()
+    history_store.flush()
+
+@app.on_event("startup")
+async def start_ingestion():
+    if ingestion_service.sources:
+        ingestion_service.start()
+
+@app.on_event("shutdown")
+async def stop_ingestion():
+    await ingestion_service.stop()
+
+@app.on_event("startup")
+async def start_aod_window():
+    aod_window.start()
+
+@app.on_event("shutdown")
+async def stop_aod_window():
+    await aod_window.stop()
+
+@app.get("/api/v1/air-quality/stream")
+async def stream_air_quality(
+    request: Request,
+    cities: str = Query(..., description="Comma-separated city names")
+):
+    """
+    Subscribe to live readings via Server-Sent Events
+    Sends a snapshot first, then a delta event whenever a watched city changes
+    """
+    indices = {city_store.index[resolve_city(c)] for c in cities.split(",") if c.strip()}
+    if not indices:
+        raise HTTPException(status_code=400, detail="At least one city is required")
+    try:
+        subscription = stream_hub.subscribe(indices)
+    except OverflowError:
+        raise HTTPException(status_code=503, detail="Too many live subscribers, retry later")
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            stream_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def describe_nearby(matches: List[tuple]) -> List[Dict]:
+    """Attach current readings to (city index, distance) pairs"""
+    latest = current_samples()
+    results = []
+    for idx, distance in matches:
+        name = city_store.names[idx]
+        sample = latest[idx]
+        results.append({
+            "city": name,
+            "state": city_store.state(idx),
+            "latitude": city_store.lat[idx],
+            "longitude": city_store.lon[idx],
+            "distance_km": round(distance, 2),
+            "aqi": sample.aqi,
+            "category": AQI_BANDS[classify_aqi(sample.aqi)][0]
+        })
+    return results
+
+@app.get("/api/v1/air-quality/nearest")
+async def get_nearest_cities(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in degrees"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in degrees"),
+    k: int = Query(default=5, ge=1, le=50, description="Number of cities")
+):
+    """Get the k nearest cities (great-circle distance) with current readings"""
+    return {
+        "query": {"latitude": lat, "longitude": lon, "k": k},
+        "cities": describe_nearby(spatial_index.nearest(lat, lon, k))
+    }
+
+@app.get("/api/v1/air-quality/within")
+async def get_cities_within(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in degrees"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in degrees"),
+    radius_km: float = Query(default=100, gt=0, le=5000, description="Search radius in km"),
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """Get all cities within a radius (great-circle distance) with current readings"""
+    matches = spatial_index.within(lat, lon, radius_km, limit)
+    return {
+        "query": {"latitude": lat, "longitude": lon, "radius_km": radius_km},
+        "count": len(matches),
+        "cities": describe_nearby(matches)
+    }
+
+# Rendered heatmap tiles keyed on (time bucket, z, x, y)
+tile_cache = ResponseCache(
+    maxsize=int(os.environ.get("AEROHEALTH_TILE_CACHE_SIZE", "1024")),
+    ttl=simulation_engine.interval
+)
+
+@app.get("/api/v1/tiles/{z}/{x}/{y}")
+async def get_heatmap_tile(z: int, x: int, y: int):
+    """
+    Get an interpolated AQI heatmap tile (XYZ / Web Mercator) for the 3D globe
+    Body is TILE_SIZE x TILE_SIZE uint8 values, row-major; AQI = value * scale, 0 = no data
+    """
+    if not tile_in_range(z, x, y):
+        raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} out of range (max zoom {MAX_ZOOM})")
+
+    latest = current_samples()
+    # Upstream observations change readings mid-bucket; the feed version tracks every change
+    bucket, version = reading_feed.bucket, reading_feed.version
+    body = tile_cache.get_or_create(
+        (bucket, version, z, x, y),
+        lambda: render_tile(spatial_index, [sample.aqi for sample in latest], z, x, y)
+    )
+    expires_in = int((bucket + 1) * simulation_engine.interval - datetime.now(timezone.utc).timestamp())
+
+    return Response(
+        content=body,
+        media_type="application/octet-stream",
+        headers={
+            "Cache-Control": f"public, max-age={max(0, expires_in)}",
+            "ETag": f'"{bucket}-{version}-{z}-{x}-{y}"',
+            "X-Tile-Size": str(TILE_SIZE),
+            "X-AQI-Scale": f"{AQI_SCALE:.6f}"
+        }
+    )
+
 @app.get("/api/v1/cities")
 async def get_supported_cities():
     """Get list of all supported cities"""
-    cities = list(ENHANCED_CITY_DATABASE.keys())
+    tiers = Counter(city_store.tier)
     return {
-        "total_cities": len(cities),
-        "tier_1_cities": len([c for c in cities if ENHANCED_CITY_DATABASE[c]["tier"] == 1]),
-        "tier_2_cities": len([c for c in cities if ENHANCED_CITY_DATABASE[c]["tier"] == 2]), 
-        "tier_3_cities": len([c for c in cities if ENHANCED_CITY_DATABASE[c]["tier"] == 3]),
-        "cities": cities,
+        "total_cities": len(city_store),
+        **{f"tier_{tier}_cities": tiers[tier] for tier in sorted(tiers)},
+        "states": len(city_store.states),
+        "regions": city_store.regions,
+        "cities": city_store.names,
         "note": "This is a sample of 500+ cities supported by the system"
     }
 
+@app.get("/api/v1/rankings")
+async def get_rankings(
+    order: str = Query(default="worst", pattern="^(worst|best)$", description="worst or best"),
+    k: int = Query(default=10, ge=1, le=100),
+    state: Optional[str] = Query(default=None),
+    tier: Optional[int] = Query(default=None)
+):
+    """Get the most polluted or cleanest cities, optionally within a state/tier"""
+    reading_feed.ensure_current()
+    ranked, total = ranking_index.top(order == "worst", k, state, tier)
+
+    return {
+        "order": order,
+        "filters": {"state": state, "tier": tier},
+        "total_matching": total,
+        "cities": [
+            {
+                "rank": rank,
+                "city": city_store.names[idx],
+                "state": city_store.state(idx),
+                "tier": city_store.tier[idx],
+                "aqi": aqi,
+                "category": AQI_BANDS[classify_aqi(aqi)][0]
+            }
+            for rank, (idx, aqi) in enumerate(ranked, 1)
+        ],
+        "timestamp": simulation_engine.bucket_start(reading_feed.bucket).isoformat()
+    }
+
+@app.get("/api/v1/aggregates")
+async def get_aggregates(
+    by: Optional[str] = Query(default=None, pattern="^(state|region|tier)$", description="state, region or tier (all when omitted)")
+):
+    """Get rolling AQI statistics per state, region and tier"""
+    reading_feed.ensure_current()
+    summary = aggregate_index.summary()
+
+    return {
+        "overall": summary["overall"],
+        **{dimension: summary[dimension] for dimension in DIMENSIONS if by in (None, dimension)},
+        "timestamp": simulation_engine.bucket_start(reading_feed.bucket).isoformat()
+    }
+
+@app.get("/api/v1/history")
+async def get_history(
+    city: str = Query(default="Lucknow"),
+    start: Optional[datetime] = Query(default=None, alias="from", description="ISO start time (default: 24h ago)"),
+    end: Optional[datetime] = Query(default=None, alias="to", description="ISO end time (default: now)"),
+    resolution: Optional[int] = Query(default=None, ge=60, le=86400, description="Downsampling bucket in seconds")
+):
+    """Get stored readings for a city, optionally downsampled to min/max/mean buckets"""
+    city = resolve_city(city)
+    reading_feed.ensure_current()
+    end_ts = int(end.timestamp()) if end else int(datetime.now(timezone.utc).timestamp())
+    start_ts = int(start.timestamp()) if start else end_ts - 86400
+    records = history_store.records(city_store.index[city], start_ts, end_ts)
+
+    if resolution:
+        series = downsample(records, resolution)
+    else:
+        series = {
+            "timestamp": [r.timestamp for r in records],
+            "aqi": [r.aqi for r in records],
+            "pm25_value": [r.pm25 for r in records],
+            "aod": [r.aod for r in records]
+        }
+
+    return {
+        "city": city,
+        "from": datetime.fromtimestamp(start_ts, timezone.utc).isoformat(),
+        "to": datetime.fromtimestamp(end_ts, timezone.utc).isoformat(),
+        "resolution": resolution,
+        "count": len(series["timestamp"]),
+        "series": series,
+        "trend": history_store.trend(city_store.index[city])
+    }
+
 @app.get("/api/v1/health")
 async def get_health_recommendations(
     city: str = Query(default="Lucknow"),
-    age_group: Optional[str] = Query(default=None, description="child, adult, senior"),
-    conditions: Optional[str] = Query(default=None, description="Comma-separated conditions")
+    age_group: Optional[str] = Query(default=None, description="child, teen, adult, senior"),
+    conditions: Optional[str] = Query(default=None, description="Comma-separated conditions"),
+    activity_level: Optional[str] = Query(default=None, description="low, moderate, high"),
+    sensitivity: Optional[str] = Query(default=None, description="low, normal, high")
 ):
     """Get personalized health recommendations"""
-    data = generate_enhanced_city_data(city)
+    city = resolve_city(city)
+    reading = get_cached_city_data(city).reading
+    content = response_builder.health_content(city_store.index[city], reading.risk_level)
 
     # Enhance recommendations based on personal factors
-    enhanced_recommendations = data.health_recommendations.general_recommendations.copy()
-
-    if age_group == "senior":
-        enhanced_recommendations.append("Extra precautions recommended for seniors")
-    elif age_group == "child":
-        enhanced_recommendations.append("Special attention needed for children's activities")
-
-    if conditions:
-        condition_list = [c.strip().lower() for c in conditions.split(",")]
-        if "asthma" in condition_list:
-            enhanced_recommendations.append("Keep rescue inhaler readily available")
-        if "heart" in " ".join(condition_list):
-            enhanced_recommendations.append("Monitor cardiovascular symptoms closely")
+    profile = personalization_engine.compile_profile(
+        age_group, (conditions or "").split(","), activity_level, sensitivity
+    )
+    advice = personalization_engine.evaluate(profile, reading.aqi)
 
     return {
         "city": city,
-        "aqi": data.air_quality.aqi,
-        "risk_level": data.air_quality.risk_level,
-        "personalized_recommendations": enhanced_recommendations,
-        "activity_guidance": data.health_recommendations.outdoor_activity_guidance,
-        "timestamp": data.timestamp
+        "aqi": reading.aqi,
+        "risk_level": reading.risk_level,
+        "personalized_recommendations": content.recommendations + list(advice.recommendations),
+        "alerts": list(advice.alerts),
+        "activity_guidance": content.activity_guidance,
+        "timestamp": reading.timestamp
     }
 
+@app.post("/api/v1/health/batch")
+async def evaluate_health_profiles(request: HealthBatchRequest):
+    """
+    Evaluate many stored health profiles against current readings in one call
+    Meant for alert services; `notify` is set when a profile with alerts enabled has alerts
+    """
+    if len(request.profiles) > HEALTH_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {HEALTH_BATCH_MAX} profiles per request")
+
+    latest = current_samples()
+    cities: Dict[str, Optional[int]] = {}
+    unknown = set()
+    results = []
+    notify_count = 0
+
+    for profile in request.profiles:
+        idx = cities.get(profile.city, -1)
+        if idx == -1:
+            idx = cities[profile.city] = city_resolver.resolve(profile.city).index
+        if idx is None:
+            unknown.add(profile.city)
+            continue
+
+        aqi = latest[idx].aqi
+        advice = personalization_engine.evaluate(
+            personalization_engine.compile_profile(
+                profile.age_group, profile.conditions, profile.activity_level, profile.sensitivity
+            ),
+            aqi
+        )
+        notify = profile.alerts_enabled and bool(advice.alerts)
+        notify_count += notify
+        if request.only_notify and not notify:
+            continue
+        results.append({
+            "id": profile.id,
+            "city": city_store.names[idx],
+            "aqi": aqi,
+            "risk_level": AQI_BANDS[classify_aqi(aqi)][1],
+            "notify": notify,
+            "alerts": advice.alerts,
+            "recommendations": advice.recommendations
+        })
+
+    return Response(content=dumps({
+        "count": len(request.profiles),
+        "notify_count": notify_count,
+        "results": results,
+        "unknown_cities": sorted(unknown),
+        "timestamp": simulation_engine.bucket_start(reading_feed.bucket).isoformat()
+    }), media_type="application/json")
+
 @app.get("/api/v1/nasa")
 async def get_nasa_satellite_info():
     """Get NASA satellite constellation information"""
@@ -404,38 +846,16 @@ async def get_nasa_satellite_info():
 @app.get("/api/v1/forecast")
 async def get_forecast(
     city: str = Query(default="Lucknow"),
-    days: int = Query(default=7, ge=1, le=7)
+    days: int = Query(default=7, ge=1, le=FORECAST_DAYS)
 ):
     """Get air quality forecast for specified days"""
-    base_data = generate_enhanced_city_data(city)
-    base_aqi = base_data.air_quality.aqi
+    city = resolve_city(city)
+    matrix = forecast_engine.matrix()
+    idx = city_store.index[city]
 
     forecast_days = []
-    trends = ["improving", "stable", "worsening"]
-    trend = random.choice(trends)
-
-    for i in range(days):
-        day_date = datetime.now() + timedelta(days=i)
-
-        # Apply trend
-        if trend == "improving":
-            day_aqi = max(20, base_aqi - (i * 5) + random.randint(-10, 10))
-        elif trend == "worsening":  
-            day_aqi = min(300, base_aqi + (i * 5) + random.randint(-10, 10))
-        else:
-            day_aqi = base_aqi + random.randint(-15, 15)
-
-        day_aqi = max(10, min(300, day_aqi))
-
-        if day_aqi <= 50:
-            day_category = "Good"
-        elif day_aqi <= 100:
-            day_category = "Moderate"
-        elif day_aqi <= 150:
-            day_category = "USG"
-        else:
-            day_category = "Unhealthy"
-
+    for day_date, day_aqi in zip(forecast_engine.dates(matrix.bucket, days), matrix.row(idx)):
+        day_category = forecast_category(day_aqi)
         forecast_days.append({
             "date": day_date.strftime("%Y-%m-%d"),
             "day_name": day_date.strftime("%A"),
@@ -447,11 +867,136 @@ async def get_forecast(
     return {
         "city": city,
         "forecast_days": forecast_days,
-        "trend": trend,
+        "trend": FORECAST_TRENDS[matrix.trend[idx]],
         "accuracy": "~85% for 3-day, ~70% for 7-day predictions",
         "disclaimer": "Forecast based on advanced simulation and regional patterns"
     }
 
+@app.get("/api/v1/forecast/bulk")
+async def get_bulk_forecast(
+    days: int = Query(default=7, ge=1, le=FORECAST_DAYS),
+    tier: Optional[int] = Query(default=None),
+    state: Optional[str] = Query(default=None),
+    region: Optional[str] = Query(default=None)
+):
+    """
+    Get forecasts for every city (or a tier/state/region subset) in one request
+    Served from the precomputed city x day matrix; `aqi[i]` is the row for `cities[i]`
+    """
+    matrix = forecast_engine.matrix()
+    indices = city_store.select(tier, state, region)
+    dates = forecast_engine.dates(matrix.bucket, days)
+
+    return {
+        "days": days,
+        "dates": [d.strftime("%Y-%m-%d") for d in dates],
+        "day_names": [d.strftime("%A") for d in dates],
+        "cities": [city_store.names[i] for i in indices],
+        "aqi": [matrix.row(i)[:days].tolist() for i in indices],
+        "trend": [matrix.trend[i] for i in indices],
+        "trends": FORECAST_TRENDS,
+        "category_limits": FORECAST_BAND_LIMITS,
+        "categories": FORECAST_CATEGORIES,
+        "generated_at": simulation_engine.bucket_start(matrix.bucket).isoformat()
+    }
+
+@app.get("/api/v1/compare")
+async def compare_cities(
+    cities: str = Query(..., description="Comma-separated city names, e.g. Delhi,Mumbai,Chennai"),
+    days: int = Query(default=FORECAST_DAYS, ge=1, le=FORECAST_DAYS)
+):
+    """
+    Compare any number of cities at once
+    `deltas[metric][i][j]` is cities[i] minus cities[j]; `difference[i][j]` indexes `differences`
+    """
+    names = [name.strip() for name in cities.split(",") if name.strip()]
+    if len(names) > COMPARE_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {COMPARE_MAX} cities per comparison")
+
+    indices: List[int] = []
+    unknown = []
+    suggestions: Dict[str, List[str]] = {}
+    for name in names:
+        resolution = city_resolver.resolve(name)
+        if resolution.index is None:
+            unknown.append(name)
+            if resolution.suggestions:
+                suggestions[name] = resolution.suggestions
+        elif resolution.index not in indices:
+            indices.append(resolution.index)
+    if len(indices) < 2:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Need at least two known cities to compare",
+                "unknown_cities": unknown,
+                "suggestions": suggestions
+            }
+        )
+
+    matrix = forecast_engine.matrix()
+    samples = current_samples()
+    aod = [city_aod(i, samples[i])[0] for i in indices]
+    result = compare(indices, samples, aod, matrix, days)
+    order = result.pop("order")
+    dates = forecast_engine.dates(matrix.bucket, days)
+
+    return Response(content=dumps({
+        "count": len(indices),
+        "cities": [city_store.names[i] for i in indices],
+        "states": [city_store.state(i) for i in indices],
+        **result,
+        "cleanest": city_store.names[indices[order[0]]],
+        "most_polluted": city_store.names[indices[order[-1]]],
+        "ranking": [city_store.names[indices[i]] for i in order],
+        "category": [AQI_BANDS[classify_aqi(aqi)][0] for aqi in result["values"]["aqi"]],
+        "differences": DIFFERENCES,
+        "difference_limits": DIFFERENCE_LIMITS,
+        "difference_advice": DIFFERENCE_ADVICE,
+        "forecast_dates": [d.strftime("%Y-%m-%d") for d in dates],
+        "trends": FORECAST_TRENDS,
+        "unknown_cities": unknown,
+        "suggestions": suggestions,
+        "timestamp": simulation_engine.bucket_start(reading_feed.bucket).isoformat()
+    }), media_type="application/json")
+
+def cache_samples(field: str):
+    return lambda: [((("cache", name),), cache.stats()[field])
+                    for name, cache in (("reading", reading_cache), ("tile", tile_cache))]
+
+metrics.gauge("aerohealth_cache_hits", "Cache hits since start", cache_samples("hits"))
+metrics.gauge("aerohealth_cache_misses", "Cache misses since start", cache_samples("misses"))
+metrics.gauge("aerohealth_cache_hit_ratio", "Cache hits / lookups", cache_samples("hit_ratio"))
+metrics.gauge("aerohealth_cache_entries", "Live cache entries", cache_samples("size"))
+metrics.gauge("aerohealth_stream_subscribers", "Connected live stream subscribers",
+              lambda: [((), stream_hub.stats()["subscribers"])])
+
+@app.on_event("startup")
+async def start_profiler():
+    # Runs on the event loop thread, which is the one worth sampling
+    profiler.start()
+
+@app.on_event("shutdown")
+async def stop_profiler():
+    profiler.stop()
+
+@app.on_event("shutdown")
+async def stop_queued_logging():
+    if queued_logging is not None:
+        queued_logging.stop()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, cache and generation metrics"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profile")
+async def get_profile(reset: bool = Query(default=False, description="Clear samples after reading")):
+    """Collapsed stacks from the sampling profiler (enable with AEROHEALTH_PROFILER_HZ)"""
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiler disabled; set AEROHEALTH_PROFILER_HZ")
+    return Response(content=profiler.collapsed(reset), media_type="text/plain")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -459,7 +1004,14 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "version": "4.0-ADVANCED",
-        "features": "All systems operational"
+        "features": "All systems operational",
+        "cache": reading_cache.stats(),
+        "stream": stream_hub.stats(),
+        "ingestion": ingestion_service.stats(),
+        "readings": reading_feed.stats(),
+        "logging": queued_logging.stats() if queued_logging is not None else None,
+        "snapshot": snapshot_follower.stats() if snapshot_follower is not None else None,
+        "worker_pid": os.getpid()
     }
 
 if __name__ == "__main__":
@@ -468,6 +1020,7 @@ if __name__ == "__main__":
     print("🚀 Starting AeroHealth Ultimate Advanced Backend...")
     print("🌍 Supporting 3D Globe, Ultra AI, 500+ Cities, Health Intelligence")
     print("📊 Enhanced space-grade atmospheric intelligence")
+    print("🏭 Development server; for production run: python serve.py --workers N")
 
     uvicorn.run(
         "main:app",
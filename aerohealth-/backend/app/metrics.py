@@ -0,0 +1,213 @@
+"""
+AeroHealth Metrics
+Per-route latency histograms, counters and gauges in Prometheus text format
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; +Inf is implicit
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Stack samples per second for the opt-in profiler (0 disables it)
+PROFILER_HZ = float(os.environ.get("AEROHEALTH_PROFILER_HZ", "0"))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is one bisect and two adds"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by name and label set, plus gauges read at scrape time"""
+
+    def __init__(self):
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(int))
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._gauges: Dict[str, Callable[[], Iterable[Tuple[Labels, float]]]] = {}
+
+    def counter(self, name: str, help: str) -> None:
+        self._meta[name] = ("counter", help)
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self._meta[name] = ("histogram", help)
+        self._buckets[name] = buckets
+
+    def gauge(self, name: str, help: str, collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+        """Register a gauge whose samples are produced by `collect` on every scrape"""
+        self._meta[name] = ("gauge", help)
+        self._gauges[name] = collect
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        self._counters[name][labels] += value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        series = self._histograms[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self._buckets[name])
+        histogram.observe(value)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, (kind, help) in self._meta.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in self._counters.get(name, {}).items():
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            elif kind == "gauge":
+                for labels, value in self._gauges[name]():
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            else:
+                for labels, histogram in self._histograms.get(name, {}).items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by route template
+
+    Requests that match no route are grouped under one label so scanners
+    cannot blow up the series count. Streaming responses are timed until
+    their last body chunk is sent.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+        self._routes: Optional[Dict[Callable, str]] = None
+        registry.counter("aerohealth_http_requests_total", "HTTP requests by route and status")
+        registry.counter("aerohealth_http_errors_total", "HTTP requests that failed with a 5xx or an exception")
+        registry.histogram("aerohealth_http_request_duration_seconds", "HTTP request latency by route")
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")}
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            labels = (("method", scope["method"]), ("route", self._route(scope)))
+            self.registry.inc("aerohealth_http_requests_total", labels + (("status", str(status)),))
+            self.registry.observe("aerohealth_http_request_duration_seconds", labels, elapsed)
+            if status >= 500:
+                self.registry.inc("aerohealth_http_errors_total", labels)
+
+
+class StackSampler:
+    """Opt-in sampling profiler for the event loop thread
+
+    A daemon thread records the target thread's Python stack `hz` times a
+    second; samples are kept as collapsed stacks ("a;b;c count"), ready for
+    flamegraph tools. The target thread is never paused or traced.
+    """
+
+    def __init__(self, hz: float = PROFILER_HZ, max_depth: int = 64):
+        self.interval = 1.0 / hz if hz > 0 else 0.0
+        self.max_depth = max_depth
+        self.samples: Dict[str, int] = defaultdict(int)
+        self.taken = 0
+        self._lock = threading.Lock()
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._target)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if stack:
+            with self._lock:
+                self.samples[";".join(reversed(stack))] += 1
+                self.taken += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="aerohealth-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self, reset: bool = False) -> str:
+        with self._lock:
+            samples = dict(self.samples)
+            if reset:
+                self.samples.clear()
+                self.taken = 0
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items(), key=lambda item: -item[1]))
@@ -0,0 +1,175 @@
+"""
+AeroHealth Personalization Engine
+Age-group, condition and activity rules compiled into per-profile lookup tables
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+AGE_GROUPS = ["child", "teen", "adult", "senior"]
+# Browser conditions first, in the order getPersonalizedHealthAdvice checks
+# them, then the conditions only the server has rules for
+CONDITIONS = ["asthma", "heart disease", "copd", "respiratory", "diabetes", "hypertension", "pregnancy"]
+ACTIVITY_LEVELS = ["low", "moderate", "high"]
+
+# Spellings used by the browser and older clients
+AGE_ALIASES = {"children": "child", "kid": "child", "teenager": "teen", "elderly": "senior"}
+CONDITION_ALIASES = {
+    "heart": "heart disease", "cardiac": "heart disease", "cardiovascular": "heart disease",
+    "high blood pressure": "hypertension", "pregnant": "pregnancy",
+}
+
+# Server-only: sensitivity shifts the AQI a profile is evaluated at (never
+# below 0). Profiles without one are evaluated exactly as the browser does.
+SENSITIVITY_OFFSETS = {"low": -25, "normal": 0, "high": 25}
+
+# What the browser shows when no rule applies
+DEFAULT_RECOMMENDATIONS = ("General precautions based on current air quality",
+                           "Stay hydrated and monitor air quality updates")
+DEFAULT_ALERTS = ("No specific health alerts for your profile at current levels",)
+
+
+class Rule(NamedTuple):
+    """Advice that applies once AQI exceeds `above`"""
+    above: int
+    recommendation: Optional[str] = None
+    alert: Optional[str] = None
+
+
+# Ported from getPersonalizedHealthAdvice in frontend/js/ultra-powerful-ai.js
+AGE_RULES: Dict[str, List[Rule]] = {
+    "child": [
+        Rule(75, "Limit children's outdoor play time",
+             "Child-specific threshold - consider masks for outdoor activities"),
+    ],
+    "senior": [
+        Rule(100, "Consider indoor activities during high pollution periods",
+             "Senior-specific threshold exceeded - extra caution advised"),
+    ],
+}
+
+CONDITION_RULES: Dict[str, List[Rule]] = {
+    "asthma": [
+        Rule(75, "Keep rescue inhaler readily available", "Asthma trigger levels detected"),
+    ],
+    "heart disease": [
+        Rule(100, "Avoid strenuous outdoor activities",
+             "Cardiovascular risk elevated due to air quality"),
+    ],
+    "copd": [
+        Rule(80, "Consider using air purifiers indoors",
+             "Respiratory condition alert - monitor symptoms closely"),
+    ],
+    "respiratory": [
+        Rule(80, "Consider using air purifiers indoors",
+             "Respiratory condition alert - monitor symptoms closely"),
+    ],
+    # Server-only: the browser's health form offers these but has no rules for them
+    "diabetes": [
+        Rule(150, "Keep outdoor exertion light and stay hydrated"),
+    ],
+    "hypertension": [
+        Rule(100, "Avoid strenuous outdoor activities",
+             "Cardiovascular risk elevated due to air quality"),
+    ],
+    "pregnancy": [
+        Rule(100, "Limit time outdoors and wear a well-fitted mask",
+             "Pregnancy alert - reduce exposure to outdoor air"),
+    ],
+}
+
+ACTIVITY_RULES: Dict[str, List[Rule]] = {
+    "high": [
+        Rule(125, "Reduce exercise intensity or move workouts indoors"),
+    ],
+}
+
+
+class Advice(NamedTuple):
+    recommendations: Tuple[str, ...]
+    alerts: Tuple[str, ...]
+
+
+class CompiledProfile(NamedTuple):
+    """A profile reduced to its table row and AQI offset"""
+    row: int
+    offset: int
+
+
+def _canonical(value: Optional[str], aliases: Dict[str, str]) -> str:
+    value = (value or "").strip().lower()
+    return aliases.get(value, value)
+
+
+class PersonalizationEngine:
+    """Evaluates profiles against AQI with one bisect and one table lookup
+
+    Every combination of age group, condition set and activity level is
+    expanded at startup into one row of advice per AQI level, where the
+    levels are the distinct rule thresholds. Rules that name the same text
+    are merged, so a profile with COPD and another respiratory condition
+    gets the advice once. For the browser's conditions and no sensitivity,
+    the advice is the browser's, defaults included.
+    """
+
+    def __init__(self, age_rules: Dict[str, List[Rule]] = AGE_RULES,
+                 condition_rules: Dict[str, List[Rule]] = CONDITION_RULES,
+                 activity_rules: Dict[str, List[Rule]] = ACTIVITY_RULES):
+        self.ages = [""] + AGE_GROUPS
+        self.conditions = CONDITIONS
+        self.activities = ACTIVITY_LEVELS
+        self.condition_bits = {name: 1 << i for i, name in enumerate(self.conditions)}
+
+        thresholds = {rule.above for rules in (age_rules, condition_rules, activity_rules)
+                      for group in rules.values() for rule in group}
+        self.thresholds = sorted(thresholds)
+
+        # table[row][level], row = (age * 2^conditions + mask) * activities + activity
+        self.table: List[Tuple[Advice, ...]] = []
+        for age in self.ages:
+            for mask in range(1 << len(self.conditions)):
+                for activity in self.activities:
+                    rules = list(age_rules.get(age, []))
+                    for i, condition in enumerate(self.conditions):
+                        if mask >> i & 1:
+                            rules.extend(condition_rules.get(condition, []))
+                    rules.extend(activity_rules.get(activity, []))
+                    self.table.append(tuple(self._advice(rules, level) for level in range(len(self.thresholds) + 1)))
+
+    def _advice(self, rules: Sequence[Rule], level: int) -> Advice:
+        # A level exceeds the first `level` thresholds
+        recommendations: List[str] = []
+        alerts: List[str] = []
+        for rule in rules:
+            if bisect_left(self.thresholds, rule.above) < level:
+                if rule.recommendation and rule.recommendation not in recommendations:
+                    recommendations.append(rule.recommendation)
+                if rule.alert and rule.alert not in alerts:
+                    alerts.append(rule.alert)
+        return Advice(tuple(recommendations) or DEFAULT_RECOMMENDATIONS, tuple(alerts) or DEFAULT_ALERTS)
+
+    def compile_profile(self, age_group: Optional[str] = None, conditions: Iterable[str] = (),
+                        activity_level: Optional[str] = None, sensitivity: Optional[str] = None) -> CompiledProfile:
+        """Map a profile onto its table row; unknown values fall back to the defaults"""
+        age = _canonical(age_group, AGE_ALIASES)
+        age = self.ages.index(age) if age in self.ages else 0
+        mask = 0
+        for condition in conditions:
+            mask |= self.condition_bits.get(_canonical(condition, CONDITION_ALIASES), 0)
+        activity = _canonical(activity_level, {})
+        activity = self.activities.index(activity) if activity in self.activities else self.activities.index("moderate")
+        offset = SENSITIVITY_OFFSETS.get(_canonical(sensitivity, {}), 0)
+        return CompiledProfile((age << len(self.conditions) | mask) * len(self.activities) + activity, offset)
+
+    def evaluate(self, profile: CompiledProfile, aqi: int) -> Advice:
+        return self.table[profile.row][bisect_left(self.thresholds, max(0, aqi + profile.offset))]
+
+    def stats(self) -> Dict:
+        return {
+            "rows": len(self.table),
+            "levels": len(self.thresholds) + 1,
+            "thresholds": self.thresholds,
+        }
+
+
+personalization_engine = PersonalizationEngine()
@@ -0,0 +1,61 @@
+"""
+AeroHealth Rankings
+Incrementally maintained most-polluted / cleanest orderings
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from simulation import CitySample
+
+
+class RankingIndex:
+    """Sorted (aqi, city index) lists for all cities, each state and each tier
+
+    Each reading moves one city within three lists (binary search plus a
+    memmove), so a top-k query is a slice from either end instead of a sort.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._aqi: Dict[int, int] = {}
+        self._orders: Dict[Hashable, List[Tuple[int, int]]] = {}
+
+    def _keys(self, idx: int) -> Tuple[Hashable, ...]:
+        return ("all", ("state", self.store.state_code[idx]), ("tier", self.store.tier[idx]))
+
+    def update(self, idx: int, sample: CitySample) -> None:
+        old = self._aqi.get(idx)
+        if old == sample.aqi:
+            return
+        for key in self._keys(idx):
+            order = self._orders.setdefault(key, [])
+            if old is not None:
+                del order[bisect_left(order, (old, idx))]
+            insort(order, (sample.aqi, idx))
+        self._aqi[idx] = sample.aqi
+
+    def top(self, worst: bool = True, k: int = 10, state: Optional[str] = None,
+            tier: Optional[int] = None) -> Tuple[List[Tuple[int, int]], int]:
+        """Return ([(city index, aqi)...], number of matching cities)"""
+        if state:
+            code = self.store.state_code_for(state)
+            order = self._orders.get(("state", code), [])
+        elif tier is not None:
+            order = self._orders.get(("tier", tier), [])
+        else:
+            order = self._orders.get("all", [])
+
+        scan = reversed(order) if worst else iter(order)
+        if state and tier is not None:
+            # Both filters: walk the (small) state list, skipping other tiers
+            tiers = self.store.tier
+            matches = [(idx, aqi) for aqi, idx in scan if tiers[idx] == tier]
+            return matches[:k], len(matches)
+
+        result = []
+        for aqi, idx in scan:
+            if len(result) == k:
+                break
+            result.append((idx, aqi))
+        return result, len(order)
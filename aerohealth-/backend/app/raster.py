@@ -0,0 +1,194 @@
+"""
+AeroHealth AOD Rasters
+Memory-mapped satellite aerosol optical depth grids sampled per city
+"""
+
+import asyncio
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+AOD_DIR = os.environ.get("AEROHEALTH_AOD_DIR")
+AOD_WINDOW_DAYS = 7
+AOD_RELOAD_INTERVAL = float(os.environ.get("AEROHEALTH_AOD_RELOAD", "600"))
+
+# Grid file: header, then rows * cols little-endian float32 values, row-major.
+# Row i is at latitude lat0 + i * dlat, column j at longitude lon0 + j * dlon.
+GRID_MAGIC = b"AOD1"
+GRID_HEADER = struct.Struct("<4sIIIddddf")  # magic, date (YYYYMMDD), rows, cols, lat0, lon0, dlat, dlon, nodata
+GRID_FILE = re.compile(r"^aod_(\d{8})\.bin$")
+
+
+def write_grid(path: Path, date: int, lat0: float, lon0: float, dlat: float, dlon: float,
+               values: Sequence[Sequence[float]], nodata: float = -9999.0) -> None:
+    """Write a grid file (used by converters and local testing)"""
+    rows, cols = len(values), len(values[0])
+    data = array("f", (v for row in values for v in row))
+    with open(path, "wb") as f:
+        f.write(GRID_HEADER.pack(GRID_MAGIC, date, rows, cols, lat0, lon0, dlat, dlon, nodata))
+        f.write(data.tobytes())
+
+
+class AODGrid:
+    """One memory-mapped grid; pixels are read straight from the page cache"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        stat = os.fstat(self._file.fileno())
+        # Identifies the file contents opened here; a regenerated file gets a new one
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.date, self.rows, self.cols, self.lat0, self.lon0, self.dlat, self.dlon, self.nodata = \
+            GRID_HEADER.unpack_from(self._map, 0)
+        if magic != GRID_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an AOD grid")
+        if len(self._map) < GRID_HEADER.size + self.rows * self.cols * 4:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+        self.values = memoryview(self._map)[GRID_HEADER.size:GRID_HEADER.size + self.rows * self.cols * 4].cast("f")
+
+    def sample(self, lat: Sequence[float], lon: Sequence[float]) -> array:
+        """Bilinear interpolation at many points at once (NaN outside the grid or on nodata)"""
+        values, cols, rows, nodata = self.values, self.cols, self.rows, self.nodata
+        out = array("f")
+        for la, lo in zip(lat, lon):
+            r = (la - self.lat0) / self.dlat
+            c = (lo - self.lon0) / self.dlon
+            if not (0 <= r <= rows - 1 and 0 <= c <= cols - 1):
+                out.append(math.nan)
+                continue
+            r0 = min(int(r), rows - 2) if rows > 1 else 0
+            c0 = min(int(c), cols - 2) if cols > 1 else 0
+            fr, fc = r - r0, c - c0
+            total = weight = 0.0
+            for dr, wr in ((0, 1 - fr), (1, fr)):
+                for dc, wc in ((0, 1 - fc), (1, fc)):
+                    w = wr * wc
+                    if w <= 0 or r0 + dr >= rows or c0 + dc >= cols:
+                        continue
+                    v = values[(r0 + dr) * cols + c0 + dc]
+                    if v != nodata and not math.isnan(v):
+                        total += v * w
+                        weight += w
+            out.append(total / weight if weight else math.nan)
+        return out
+
+    def close(self) -> None:
+        if hasattr(self, "values"):
+            self.values.release()
+        self._map.close()
+        self._file.close()
+
+
+class AODWindow:
+    """The newest AOD_WINDOW_DAYS grids, held open and pre-sampled at every city
+
+    Grids are sampled once when they enter the window, so serving a city's
+    satellite block is two array reads with no file I/O on the request path.
+    """
+
+    def __init__(self, store, directory: Optional[str] = AOD_DIR, days: int = AOD_WINDOW_DAYS):
+        self.store = store
+        self.directory = Path(directory) if directory else None
+        self.days = days
+        self.grids: Dict[int, AODGrid] = {}
+        self._samples: Dict[int, array] = {}
+        self.average: Optional[array] = None
+        self.latest: Optional[array] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reload(self) -> None:
+        """Open new or replaced grids, close ones that fell out of the window, recompute per-city values
+
+        Grids are keyed on (date, mtime, size), so a file regenerated under
+        the same date is re-read.
+        """
+        if self.directory is None or not self.directory.is_dir():
+            return
+        found: Dict[int, Path] = {}
+        versions: Dict[int, Tuple[int, int]] = {}
+        for path in self.directory.iterdir():
+            match = GRID_FILE.match(path.name)
+            if match:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                found[int(match[1])] = path
+                versions[int(match[1])] = (stat.st_mtime_ns, stat.st_size)
+        wanted = sorted(found)[-self.days:]
+        current = {date: grid.version for date, grid in self.grids.items()}
+        if current == {date: versions[date] for date in wanted}:
+            return
+
+        for date in [d for d in self.grids if d not in wanted or self.grids[d].version != versions[d]]:
+            self.grids.pop(date).close()
+            self._samples.pop(date, None)
+        for date in wanted:
+            if date not in self.grids:
+                try:
+                    grid = AODGrid(found[date])
+                except (OSError, ValueError, struct.error) as e:
+                    logger.warning(f"⚠️ Skipping AOD grid {found[date]}: {e}")
+                    continue
+                self.grids[date] = grid
+                self._samples[date] = grid.sample(self.store.lat, self.store.lon)
+        self._summarize()
+
+    def rebind(self, store) -> None:
+        """Re-sample the open grids at a new city list"""
+        self.store = store
+        self._samples = {date: grid.sample(store.lat, store.lon) for date, grid in self.grids.items()}
+        self._summarize()
+
+    def _summarize(self) -> None:
+        dates = sorted(self._samples)
+        if not dates:
+            self.average = self.latest = None
+            return
+        average = array("f")
+        for idx in range(len(self.store)):
+            valid = [v for v in (self._samples[d][idx] for d in dates) if not math.isnan(v)]
+            average.append(sum(valid) / len(valid) if valid else math.nan)
+        self.average = average
+        self.latest = self._samples[dates[-1]]
+
+    def city_aod(self, idx: int) -> Optional[Tuple[float, float]]:
+        """(window average, latest) AOD for a city, or None without satellite coverage"""
+        if self.average is None:
+            return None
+        average, latest = self.average[idx], self.latest[idx]
+        if math.isnan(average):
+            return None
+        return round(average, 3), round(latest if not math.isnan(latest) else average, 3)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"❌ AOD reload failed: {e}")
+            await asyncio.sleep(AOD_RELOAD_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is None and self.directory is not None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
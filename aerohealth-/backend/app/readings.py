@@ -0,0 +1,141 @@
+"""
+AeroHealth Reading Feed
+Publishes every city's current reading to incremental listeners
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Protocol
+
+from simulation import CitySample, SimulationEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds an upstream observation stands in for the simulation
+OBSERVATION_MAX_AGE = float(os.environ.get("AEROHEALTH_OBSERVATION_MAX_AGE", "900"))
+
+
+class ReadingListener(Protocol):
+    def update(self, idx: int, sample: CitySample) -> None:
+        ...
+
+
+class ReadingFeed:
+    """Holds the latest reading per city and forwards each new one to listeners
+
+    A full refresh happens once per simulation bucket (from a background task,
+    or lazily from the first request that notices the bucket moved).
+    Upstream readings go through `observe`; a city observed within
+    `max_age` seconds keeps its observation across refreshes instead of
+    being simulated.
+    """
+
+    def __init__(self, store, simulation: SimulationEngine, max_age: float = OBSERVATION_MAX_AGE,
+                 clock=time.time):
+        self.store = store
+        self.simulation = simulation
+        self.max_age = max_age
+        self._clock = clock
+        self.latest: List[Optional[CitySample]] = [None] * len(store)
+        # When each city was last observed upstream (0 = never)
+        self.observed_at: List[float] = [0.0] * len(store)
+        self.observations = 0
+        self.bucket: Optional[int] = None
+        self.version = 0
+        self._listeners: List[ReadingListener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, listener: ReadingListener) -> None:
+        self._listeners.append(listener)
+        for idx, sample in enumerate(self.latest):
+            if sample is not None:
+                listener.update(idx, sample)
+
+    def rebind(self, store, listeners: List[ReadingListener]) -> None:
+        """Switch to a new city list, keeping each remaining city's reading by name
+
+        `listeners` replace the current ones (they index the old list). Cities
+        new to the list are simulated on the next refresh.
+        """
+        previous = {name: idx for idx, name in enumerate(self.store.names)}
+        latest, observed_at = self.latest, self.observed_at
+        self.store = store
+        self.latest = [None] * len(store)
+        self.observed_at = [0.0] * len(store)
+        for idx, name in enumerate(store.names):
+            old = previous.get(name)
+            if old is not None:
+                self.latest[idx] = latest[old]
+                self.observed_at[idx] = observed_at[old]
+        self.version += 1
+        self.bucket = None
+        self._listeners = []
+        for listener in listeners:
+            self.subscribe(listener)
+
+    def record(self, idx: int, sample: CitySample) -> None:
+        """Publish one new reading"""
+        if self.latest[idx] == sample:
+            return
+        self.latest[idx] = sample
+        self.version += 1
+        for listener in self._listeners:
+            listener.update(idx, sample)
+
+    def observe(self, idx: int, sample: CitySample) -> None:
+        """Publish a reading from an upstream source"""
+        self.observed_at[idx] = self._clock()
+        self.observations += 1
+        self.record(idx, sample)
+
+    def observed(self, idx: int) -> bool:
+        """Whether the city's reading is a fresh upstream observation"""
+        return self._clock() - self.observed_at[idx] <= self.max_age
+
+    def refresh(self, bucket: Optional[int] = None) -> None:
+        """Publish the simulated reading of every city without a fresh observation"""
+        if bucket is None:
+            bucket = self.simulation.bucket()
+        names, base_aqi, observed_at = self.store.names, self.store.base_aqi, self.observed_at
+        cutoff = self._clock() - self.max_age
+        for idx, name in enumerate(names):
+            if observed_at[idx] < cutoff:
+                self.record(idx, self.simulation.sample(name, base_aqi[idx], bucket))
+        self.bucket = bucket
+
+    def stats(self) -> Dict:
+        cutoff = self._clock() - self.max_age
+        return {
+            "observations": self.observations,
+            "observed_cities": sum(1 for ts in self.observed_at if ts >= cutoff),
+        }
+
+    def ensure_current(self) -> None:
+        """Refresh if the bucket has moved since the last refresh"""
+        bucket = self.simulation.bucket()
+        if bucket != self.bucket:
+            self.refresh(bucket)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.ensure_current()
+            except Exception as e:
+                logger.error(f"❌ Reading refresh failed: {e}")
+            interval = self.simulation.interval
+            await asyncio.sleep(interval - time.time() % interval + 0.01)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,148 @@
+"""
+AeroHealth City Name Resolver
+Typo-tolerant city lookups backed by a trigram inverted index
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Alternate and historical names -> dataset name (mirrors the frontend aliases)
+CITY_ALIASES = {
+    "new delhi": "Delhi",
+    "ncr": "Delhi",
+    "national capital region": "Delhi",
+    "bombay": "Mumbai",
+    "calcutta": "Kolkata",
+    "madras": "Chennai",
+    "bengaluru": "Bangalore",
+    "mysuru": "Mysore",
+    "cochin": "Kochi",
+    "trivandrum": "Thiruvananthapuram",
+    "gurugram": "Gurgaon",
+    "poona": "Pune",
+    "baroda": "Vadodara",
+    "cawnpore": "Kanpur",
+    "benares": "Varanasi",
+    "banaras": "Varanasi",
+    "prayagraj": "Allahabad",
+    "bezawada": "Vijayawada",
+}
+
+# Candidates re-ranked by edit distance after trigram filtering
+CANDIDATE_POOL = 24
+
+_SEPARATORS = re.compile(r"[\s\-_.,']+")
+
+
+def normalize(name: str) -> str:
+    """Lowercase and collapse separators so 'Navi-Mumbai ' == 'navi mumbai'"""
+    return _SEPARATORS.sub(" ", name.lower()).strip()
+
+
+def trigrams(text: str) -> Iterable[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one edit),
+    or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = cost
+            row_min = min(row_min, cost)
+        if row_min > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def max_typos(text: str) -> int:
+    """Edits tolerated when auto-correcting a name of this length"""
+    if len(text) < 5:
+        return 0
+    return 1 if len(text) < 9 else 2
+
+
+class Resolution(NamedTuple):
+    index: Optional[int]
+    suggestions: List[str]
+    corrected: bool = False
+
+
+class CityResolver:
+    """Resolves user-supplied names to city indices
+
+    Exact names and aliases hit a dict; anything else is looked up through a
+    trigram inverted index, and only the best few candidates pay for an edit
+    distance check, so cost stays flat as the dataset grows.
+    """
+
+    def __init__(self, names: List[str], aliases: Optional[Dict[str, str]] = None):
+        self.names = names
+        self._keys: List[str] = []
+        self._key_city: List[int] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+
+        name_index = {name: i for i, name in enumerate(names)}
+        for i, name in enumerate(names):
+            self._add_key(normalize(name), i)
+        for alias, target in (aliases if aliases is not None else CITY_ALIASES).items():
+            if target in name_index:
+                self._add_key(normalize(alias), name_index[target])
+
+    def _add_key(self, key: str, city: int) -> None:
+        if key in self._exact:
+            return
+        key_id = len(self._keys)
+        self._keys.append(key)
+        self._key_city.append(city)
+        self._exact[key] = city
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, []).append(key_id)
+
+    def candidates(self, query: str, limit: int = 5, max_distance: int = 3) -> List[Tuple[int, int]]:
+        """Return up to `limit` (city index, edit distance) pairs, best first"""
+        key = normalize(query)
+        shared = Counter()
+        for gram in trigrams(key):
+            shared.update(self._postings.get(gram, ()))
+
+        ranked = []
+        seen = set()
+        for key_id, common in shared.most_common(CANDIDATE_POOL):
+            city = self._key_city[key_id]
+            distance = bounded_edit_distance(key, self._keys[key_id], max_distance)
+            if distance <= max_distance:
+                ranked.append((distance, -common, city))
+
+        results = []
+        for distance, _, city in sorted(ranked):
+            if city not in seen:
+                seen.add(city)
+                results.append((city, distance))
+        return results[:limit]
+
+    def resolve(self, query: str, suggestions: int = 3) -> Resolution:
+        """Resolve a name exactly, via alias, or by a single unambiguous typo fix"""
+        key = normalize(query)
+        city = self._exact.get(key)
+        if city is not None:
+            return Resolution(city, [])
+
+        matches = self.candidates(key, limit=suggestions, max_distance=max(3, len(key) // 3))
+        allowed = max_typos(key)
+        if matches and matches[0][1] <= allowed and (len(matches) == 1 or matches[1][1] > matches[0][1]):
+            return Resolution(matches[0][0], [], corrected=True)
+        return Resolution(None, [self.names[city] for city, _ in matches])
@@ -0,0 +1,193 @@
+"""
+AeroHealth Response Builder
+Per-city JSON fragments compiled at startup; requests only splice in the numbers
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Encode JSON to UTF-8 bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+STATE_EMOJIS = {
+    "Maharashtra": "🏙️", "Gujarat": "🏭", "Karnataka": "🌳", "Tamil Nadu": "🏖️",
+    "Kerala": "🌴", "Delhi": "🏛️", "Punjab": "🌾", "Rajasthan": "🏰",
+    "West Bengal": "🎭", "Uttar Pradesh": "🕌", "Bihar": "📿"
+}
+
+SENSITIVE_GROUPS = [
+    "Children and teenagers",
+    "Adults over 65 years",
+    "Pregnant women",
+    "People with respiratory conditions",
+    "People with cardiovascular disease"
+]
+
+
+class RiskContent(NamedTuple):
+    health_impact: str
+    recommendations: List[str]
+    activity_guidance: Dict[str, str]
+
+
+_LOW = RiskContent(
+    "Excellent atmospheric conditions in {city}! Perfect for all outdoor activities.",
+    [
+        "Outstanding conditions for outdoor activities in {city}",
+        "Perfect for exercise and recreational activities",
+        "Excellent conditions for children to play outside"
+    ],
+    {"running": "Safe", "walking": "Safe", "cycling": "Safe"}
+)
+_LOW_MODERATE = RiskContent(
+    "Good air quality in {city}. Generally acceptable for most people.",
+    [
+        "Normal outdoor activities recommended in {city}",
+        "Sensitive individuals should monitor conditions",
+        "Good for moderate exercise and activities"
+    ],
+    {"running": "Safe", "walking": "Safe", "cycling": "Caution"}
+)
+_MODERATE = RiskContent(
+    "Air quality in {city} is concerning for sensitive groups. Monitor conditions.",
+    [
+        "Limit prolonged outdoor activities in {city}",
+        "Sensitive groups should wear masks",
+        "Consider indoor alternatives during peak hours"
+    ],
+    {"running": "Caution", "walking": "Limited", "cycling": "Limited"}
+)
+_HIGH = RiskContent(
+    "Air quality in {city} requires caution. Limit outdoor exposure.",
+    [
+        "Stay indoors in {city} when possible",
+        "Avoid outdoor exercise",
+        "Use air purifiers and N95 masks"
+    ],
+    {"running": "Avoid", "walking": "Avoid", "cycling": "Avoid"}
+)
+
+# Health content per risk level; city names are filled in per city at startup
+RISK_CONTENT = {
+    "Low": _LOW,
+    "Low-Moderate": _LOW_MODERATE,
+    "Moderate": _MODERATE,
+    "High": _HIGH,
+    "Very High": _HIGH,
+}
+
+AOD_LIMITS = [(0.2, "Excellent"), (0.3, "Good"), (0.4, "Moderate"), (0.5, "Fair")]
+DEFAULT_DATA_RANGE = "7 days enhanced simulation"
+DEFAULT_SPACE_GRADE = "Ultimate modeling applied"
+
+
+def aod_category(aod: float) -> str:
+    for limit, category in AOD_LIMITS:
+        if aod < limit:
+            return category
+    return "Poor"
+
+
+class CityReading(NamedTuple):
+    """The dynamic part of a current-conditions response"""
+    city: str
+    aqi: int
+    category: str
+    risk_level: str
+    pm25: int
+    aod: float
+    latest_aod: float
+    trend: str
+    timestamp: str
+
+
+class ResponseBuilder:
+    """Compiles the static parts of /api/v1/air-quality/current for every city
+
+    Location, space interface and the health block for each risk level never
+    change for a city, so they are encoded once. Building a response is a
+    join of those byte fragments with a few freshly encoded numbers, and the
+    output matches CurrentAirQualityResponse field for field.
+    """
+
+    def __init__(self, store, risk_levels: Sequence[str]):
+        self.store = store
+        self._head: List[bytes] = []
+        self._tail: List[bytes] = []
+        self._risk: List[Dict[str, Tuple[bytes, bytes]]] = []
+        for idx, name in enumerate(store.names):
+            state = store.state(idx)
+            space_code = f"{name[:3].upper()}-001"
+            sector = f"{state} Sector"
+            location = {
+                "latitude": store.lat[idx],
+                "longitude": store.lon[idx],
+                "country": "India",
+                "emoji": STATE_EMOJIS.get(state, "🏙️"),
+                "space_code": space_code,
+                "sector": sector,
+            }
+            space_interface = {
+                "cosmic_status": "Ultimate Advanced Edition active",
+                "detailed_intelligence": f"Advanced analytics for {name}",
+                "space_code": space_code,
+                "sector": sector,
+            }
+            self._head.append(b'{"city":' + dumps(name) + b',"location":' + dumps(location) + b',"air_quality":{"aqi":')
+            self._tail.append(b',"space_interface":' + dumps(space_interface) + b',"timestamp":')
+
+            per_risk = {}
+            for risk_level in risk_levels:
+                impact, recommendations, guidance = self.health_content(idx, risk_level)
+                health = {
+                    "health_impact": impact,
+                    "general_recommendations": recommendations,
+                    "risk_level": risk_level,
+                    "outdoor_activity_guidance": guidance,
+                    "sensitive_groups": SENSITIVE_GROUPS,
+                }
+                per_risk[risk_level] = (dumps(impact), b',"health_recommendations":' + dumps(health))
+            self._risk.append(per_risk)
+
+    def health_content(self, idx: int, risk_level: str) -> RiskContent:
+        """Health impact, recommendations and activity guidance for a city at a risk level"""
+        name = self.store.names[idx]
+        content = RISK_CONTENT[risk_level]
+        return RiskContent(
+            content.health_impact.format(city=name),
+            [line.format(city=name) for line in content.recommendations],
+            dict(content.activity_guidance)
+        )
+
+    def build(self, idx: int, reading: CityReading, data_range: str = DEFAULT_DATA_RANGE,
+              space_grade: str = DEFAULT_SPACE_GRADE) -> bytes:
+        impact, health = self._risk[idx][reading.risk_level]
+        return b"".join((
+            self._head[idx],
+            str(reading.aqi).encode(),
+            b',"category":', dumps(reading.category),
+            b',"dominant_pollutant":"PM2.5","risk_level":', dumps(reading.risk_level),
+            b',"pm25_value":', str(reading.pm25).encode(),
+            b'},"nasa_satellite":{"average_aod":', repr(float(reading.aod)).encode(),
+            b',"latest_aod":', repr(float(reading.latest_aod)).encode(),
+            b',"trend":', dumps(reading.trend),
+            b',"category":', dumps(aod_category(reading.aod)),
+            b',"visibility_km":', str(max(3, round(50 / max(reading.aod, 0.01)))).encode(),
+            b',"health_impact":', impact,
+            b',"data_range":', dumps(data_range),
+            b',"space_grade":', dumps(space_grade),
+            b'}', health,
+            self._tail[idx],
+            dumps(reading.timestamp),
+            b'}'
+        ))
@@ -0,0 +1,172 @@
+"""
+AeroHealth Production Server
+N uvicorn workers on one socket, sharing a city/forecast snapshot through shared memory
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+The launcher builds the city store and forecast matrix once and publishes
+them; workers attach zero-copy instead of parsing and simulating on their
+own. SIGHUP reloads the city data and republishes; workers switch to a
+changed city list in place, without a restart. SIGINT/SIGTERM stop.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import List, Optional
+
+import uvicorn
+
+from city_store import load_city_store
+from forecast import ForecastEngine
+from history import HistoryStore
+from logs import LOG_FORMAT
+from simulation import simulation_engine
+from snapshot import SnapshotPublisher
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get("AEROHEALTH_WORKERS", str(os.cpu_count() or 1)))
+WORKER_START_TIMEOUT = 30.0
+WORKER_STOP_TIMEOUT = 15.0
+
+
+def run_worker(sock: socket.socket, log_level: str, ready) -> None:
+    """Worker process entry point: serve main:app on the inherited socket"""
+    # Access lines are only kept when the queued JSON pipeline can take them off the loop
+    config = uvicorn.Config("main:app", log_level=log_level, access_log=LOG_FORMAT == "json")
+    config.setup_event_loop()
+    server = uvicorn.Server(config)
+
+    async def serve():
+        task = asyncio.ensure_future(server.serve(sockets=[sock]))
+        while not server.started and not task.done():
+            await asyncio.sleep(0.05)
+        ready.set()
+        await task
+
+    asyncio.run(serve())
+
+
+class Launcher:
+    """Publishes the snapshot, supervises workers and republishes each time bucket"""
+
+    def __init__(self, workers: int, host: str, port: int, log_level: str = "info"):
+        self.workers = max(1, workers)
+        self.log_level = log_level
+        self.sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        self.publisher = SnapshotPublisher()
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self.store_bytes = b""
+        self.forecast: Optional[ForecastEngine] = None
+        self.bucket: Optional[int] = None
+        self._reload = False
+        self._stop = False
+
+    def load(self) -> bool:
+        """(Re)load the city data; True when it differs from what is published"""
+        store = load_city_store()
+        data = store.to_bytes()
+        if data == self.store_bytes:
+            return False
+        # Lay out the history file for this city list before any writer opens it
+        HistoryStore(store.names, writable=True).close()
+        self.store_bytes = data
+        self.forecast = ForecastEngine(store, simulation_engine)
+        return True
+
+    def publish(self) -> None:
+        matrix = self.forecast.matrix()
+        generation = self.publisher.publish(self.store_bytes, matrix)
+        self.bucket = matrix.bucket
+        logger.info(f"📦 Published snapshot generation {generation} (bucket {matrix.bucket}, "
+                    f"forecast built in {self.forecast.last_build_ms:.1f}ms)")
+
+    def spawn(self, slot: int) -> multiprocessing.Process:
+        # Settings reach the worker through its environment, which is copied
+        # at start. Slot 0 owns history writes; the rest map it read-only.
+        os.environ["AEROHEALTH_SNAPSHOT"] = self.publisher.name
+        os.environ["AEROHEALTH_HISTORY_WRITER"] = "1" if slot == 0 else "0"
+        ready = self.context.Event()
+        process = self.context.Process(
+            target=run_worker, name=f"aerohealth-worker-{slot}", args=(self.sock, self.log_level, ready)
+        )
+        process.start()
+        if not ready.wait(WORKER_START_TIMEOUT):
+            logger.warning(f"⚠️ Worker {slot} (pid {process.pid}) not ready after {WORKER_START_TIMEOUT:.0f}s")
+        self.processes[slot] = process
+        return process
+
+    def reload(self) -> None:
+        try:
+            changed = self.load()
+        except Exception as e:
+            logger.error(f"❌ Reload failed, keeping the current snapshot: {e}")
+            return
+        self.publish()
+        if changed:
+            logger.info("🔄 City data changed; workers switch to it on their next snapshot poll")
+
+    def _handle(self, signum, frame) -> None:
+        if signum == signal.SIGHUP:
+            self._reload = True
+        else:
+            self._stop = True
+
+    def run(self) -> None:
+        for signum in (signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self._handle)
+
+        self.load()
+        self.publish()
+        for slot in range(self.workers):
+            self.spawn(slot)
+        host, port = self.sock.getsockname()[:2]
+        logger.info(f"🚀 {self.workers} workers serving on http://{host}:{port}")
+
+        try:
+            while not self._stop:
+                time.sleep(0.5)
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                if simulation_engine.bucket() != self.bucket:
+                    self.publish()
+                for slot, process in enumerate(self.processes):
+                    if not self._stop and not process.is_alive():
+                        logger.warning(f"⚠️ Worker {slot} exited with {process.exitcode}; restarting")
+                        self.spawn(slot)
+        finally:
+            logger.info("🛑 Stopping workers")
+            for process in self.processes:
+                if process is not None:
+                    process.terminate()
+            for process in self.processes:
+                if process is not None:
+                    process.join(WORKER_STOP_TIMEOUT)
+                    if process.is_alive():
+                        process.kill()
+            self.publisher.close()
+            self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AeroHealth production server")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=os.environ.get("AEROHEALTH_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("AEROHEALTH_PORT", "8000")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    Launcher(args.workers, args.host, args.port, args.log_level).run()
@@ -0,0 +1,98 @@
+"""
+AeroHealth Simulation Engine
+Deterministic, time-bucketed atmospheric simulation shared by every worker
+"""
+
+import hashlib
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Bump when the simulation formulas change so old buckets are not reused
+MODEL_VERSION = "4.0-ADVANCED"
+
+# Seconds during which a city's reading stays identical across workers
+SIMULATION_INTERVAL = int(os.environ.get("AEROHEALTH_SIM_INTERVAL", "300"))
+
+FORECAST_TRENDS = ["improving", "stable", "worsening"]
+
+
+class CitySample(NamedTuple):
+    aqi: int
+    aod: float
+    latest_aod: float
+    pm25: int
+
+
+class SimulationEngine:
+    """Seeds one PRNG per (model version, city, time bucket)
+
+    Any process asking for the same city within the same bucket gets the same
+    numbers, so readings can be cached and agree across uvicorn workers.
+    """
+
+    def __init__(self, interval: int = SIMULATION_INTERVAL, model_version: str = MODEL_VERSION):
+        self.interval = max(1, interval)
+        self.model_version = model_version
+        self._memo_bucket: Optional[int] = None
+        self._memo: Dict[str, CitySample] = {}
+
+    def bucket(self, now: Optional[float] = None) -> int:
+        """Return the time bucket containing `now` (defaults to the current time)"""
+        return int((time.time() if now is None else now) // self.interval)
+
+    def bucket_start(self, bucket: int) -> datetime:
+        """Return the UTC start of a time bucket"""
+        return datetime.fromtimestamp(bucket * self.interval, tz=timezone.utc)
+
+    def rng(self, city: str, bucket: int, stream: str = "current") -> random.Random:
+        """Build the PRNG for a city, bucket and named stream"""
+        key = f"{self.model_version}|{stream}|{city}|{bucket}".encode()
+        seed = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+        return random.Random(seed)
+
+    def sample(self, city: str, base_aqi: int, bucket: Optional[int] = None) -> CitySample:
+        """Return the simulated reading for a city in a bucket (memoized per bucket)"""
+        if bucket is None:
+            bucket = self.bucket()
+        if bucket != self._memo_bucket:
+            self._memo_bucket = bucket
+            self._memo = {}
+
+        sample = self._memo.get(city)
+        if sample is None:
+            sample = self._draw(city, base_aqi, bucket)
+            self._memo[city] = sample
+        return sample
+
+    def forecast(self, city: str, start_aqi: int, days: int, bucket: Optional[int] = None) -> Tuple[str, List[int]]:
+        """Return (trend, daily AQI values) for a city starting from its current AQI"""
+        if bucket is None:
+            bucket = self.bucket()
+        rng = self.rng(city, bucket, "forecast")
+        trend = rng.choice(FORECAST_TRENDS)
+
+        values = []
+        for i in range(days):
+            if trend == "improving":
+                day_aqi = max(20, start_aqi - (i * 5) + rng.randint(-10, 10))
+            elif trend == "worsening":
+                day_aqi = min(300, start_aqi + (i * 5) + rng.randint(-10, 10))
+            else:
+                day_aqi = start_aqi + rng.randint(-15, 15)
+            values.append(max(10, min(300, day_aqi)))
+        return trend, values
+
+    def _draw(self, city: str, base_aqi: int, bucket: int) -> CitySample:
+        rng = self.rng(city, bucket)
+        aqi = max(10, min(300, base_aqi + rng.randint(-25, 35)))
+        aod = round((aqi / 150) * 0.5 + rng.uniform(0.05, 0.15), 3)
+        pm25 = round(aqi * 0.7 + rng.uniform(0, 10))
+        latest_aod = round(aod * rng.uniform(0.9, 1.1), 3)
+        return CitySample(aqi, aod, latest_aod, pm25)
+
+
+# Shared engine used by the API
+simulation_engine = SimulationEngine()
@@ -0,0 +1,278 @@
+"""
+AeroHealth Shared Snapshot
+City store and forecast matrix published once in shared memory and read zero-copy by workers
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, NamedTuple, Optional
+
+from city_store import CityStore
+from forecast import ForecastMatrix
+
+logger = logging.getLogger(__name__)
+
+# Control segment name, set for workers by the launcher
+SNAPSHOT_NAME = os.environ.get("AEROHEALTH_SNAPSHOT")
+SNAPSHOT_POLL = float(os.environ.get("AEROHEALTH_SNAPSHOT_POLL", "1"))
+
+# Control segment: the generation workers should be using (0 = none yet).
+# It is a single aligned 8-byte store, so readers never see a torn value.
+CONTROL = struct.Struct("<4sxxxxQ")
+CONTROL_MAGIC = b"AHSC"
+
+# Generation segment: header, city store snapshot, forecast aqi (uint16), trend (uint8)
+SEGMENT = struct.Struct("<4sxxxxQQII8sIIII")  # magic, generation, bucket, days, cities, store digest,
+SEGMENT_MAGIC = b"AHSS"                        # store offset, store size, aqi offset, trend offset
+SEGMENT_HEADER_SIZE = 64
+
+
+class Snapshot(NamedTuple):
+    generation: int
+    store_digest: bytes
+    store: CityStore
+    forecast: ForecastMatrix
+
+
+def store_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def _align(offset: int, to: int = 8) -> int:
+    return -(-offset // to) * to
+
+
+def remap_forecast(matrix: ForecastMatrix, source: CityStore, target: CityStore,
+                   fallback: ForecastMatrix) -> ForecastMatrix:
+    """Reorder a matrix indexed by `source` cities into `target` order, matching by name
+
+    Cities `source` does not have keep their row from `fallback`.
+    """
+    days = matrix.days
+    aqi = array("H")
+    trend = array("B")
+    for idx, name in enumerate(target.names):
+        new = source.index.get(name)
+        if new is None:
+            aqi.extend(fallback.row(idx))
+            trend.append(fallback.trend[idx])
+        else:
+            aqi.extend(matrix.row(new))
+            trend.append(matrix.trend[new])
+    return ForecastMatrix(matrix.bucket, days, aqi, trend)
+
+
+class AttachedSegment(SharedMemory):
+    """A segment a worker reads from; its zero-copy views may outlive close()"""
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass  # views are still referenced; the mapping goes away with the process
+
+
+def read_segment(buf: memoryview) -> Snapshot:
+    """Wrap a generation segment; every column and the matrix are views into `buf`"""
+    (magic, generation, bucket, days, cities, digest,
+     store_offset, store_size, aqi_offset, trend_offset) = SEGMENT.unpack_from(buf, 0)
+    if magic != SEGMENT_MAGIC:
+        raise ValueError("Not an AeroHealth snapshot segment")
+    store = CityStore.from_bytes(buf[store_offset:store_offset + store_size], copy=False)
+    aqi = buf[aqi_offset:aqi_offset + cities * days * 2].cast("H")
+    trend = buf[trend_offset:trend_offset + cities].cast("B")
+    return Snapshot(generation, digest, store, ForecastMatrix(bucket, days, aqi, trend))
+
+
+class SnapshotPublisher:
+    """Owns the control segment and one segment per published generation
+
+    The previous generation is kept until the next publish so a worker that
+    read the control block just before a switch can still attach; older
+    segments are unlinked, which leaves existing worker mappings valid.
+    """
+
+    def __init__(self, prefix: Optional[str] = None):
+        self.prefix = prefix or f"aerohealth_{os.getpid()}"
+        self.control = SharedMemory(name=f"{self.prefix}_ctl", create=True, size=CONTROL.size)
+        CONTROL.pack_into(self.control.buf, 0, CONTROL_MAGIC, 0)
+        self.generation = 0
+        self.store_digest = b""
+        self._segments: Dict[int, SharedMemory] = {}
+
+    @property
+    def name(self) -> str:
+        return self.control.name
+
+    def publish(self, store_bytes: bytes, matrix: ForecastMatrix) -> int:
+        """Write a new generation and point the control block at it"""
+        generation = self.generation + 1
+        cities = len(matrix.trend)
+
+        # Place the store so its columns start 8-byte aligned
+        store_offset = _align(SEGMENT_HEADER_SIZE + CityStore.columns_offset(store_bytes)) \
+            - CityStore.columns_offset(store_bytes)
+        aqi_offset = _align(store_offset + len(store_bytes))
+        trend_offset = _align(aqi_offset + len(matrix.aqi) * 2)
+        size = trend_offset + cities
+
+        segment = SharedMemory(name=f"{self.prefix}_g{generation}", create=True, size=size)
+        digest = store_digest(store_bytes)
+        SEGMENT.pack_into(segment.buf, 0, SEGMENT_MAGIC, generation, matrix.bucket, matrix.days, cities, digest,
+                          store_offset, len(store_bytes), aqi_offset, trend_offset)
+        segment.buf[store_offset:store_offset + len(store_bytes)] = store_bytes
+        segment.buf[aqi_offset:aqi_offset + len(matrix.aqi) * 2] = matrix.aqi.tobytes()
+        segment.buf[trend_offset:trend_offset + cities] = matrix.trend.tobytes()
+
+        self._segments[generation] = segment
+        CONTROL.pack_into(self.control.buf, 0, CONTROL_MAGIC, generation)
+        self.generation = generation
+        self.store_digest = digest
+
+        for old in [g for g in self._segments if g < generation - 1]:
+            stale = self._segments.pop(old)
+            stale.close()
+            stale.unlink()
+        return generation
+
+    def close(self) -> None:
+        for segment in self._segments.values():
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+        self.control.close()
+        self.control.unlink()
+
+
+class SnapshotFollower:
+    """Worker side: attaches to the published snapshot and follows new generations
+
+    Later generations normally only swap the forecast matrix. When the
+    published city data has changed, the new store is handed to the
+    `on_store_change` callback, which rebuilds the worker's indexes in place,
+    and this follower moves to it. Without a callback (or if it fails) the
+    store stays pinned and new matrices are re-mapped onto its city order.
+    """
+
+    def __init__(self, name: str = SNAPSHOT_NAME, poll: float = SNAPSHOT_POLL):
+        self.control = AttachedSegment(name=name)
+        self.prefix = name[:-len("_ctl")]
+        self.poll = poll
+        self.forecast_engine = None
+        self.store_listener: Optional[Callable[[CityStore], None]] = None
+        self._segments: Dict[int, SharedMemory] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        snapshot = self._attach()
+        if snapshot is None:
+            raise RuntimeError(f"No snapshot published in {name}")
+        self.generation = snapshot.generation
+        self.store_digest = snapshot.store_digest
+        self.store = snapshot.store
+        self.forecast = snapshot.forecast
+        self._pinned = snapshot.generation
+        self.remapped = 0
+        self.store_reloads = 0
+
+    def _attach(self) -> Optional[Snapshot]:
+        for _ in range(3):
+            magic, generation = CONTROL.unpack_from(self.control.buf, 0)
+            if magic != CONTROL_MAGIC or generation == 0:
+                return None
+            try:
+                segment = self._segments.get(generation) or AttachedSegment(name=f"{self.prefix}_g{generation}")
+            except FileNotFoundError:
+                continue  # superseded while we looked; read the control block again
+            self._segments[generation] = segment
+            return read_segment(segment.buf)
+        return None
+
+    def follow(self, forecast_engine) -> None:
+        """Serve this snapshot's forecasts from `forecast_engine`"""
+        self.forecast_engine = forecast_engine
+        forecast_engine.adopt(self.forecast)
+
+    def on_store_change(self, callback: Callable[[CityStore], None]) -> None:
+        """Call `callback` with the new store whenever the published city data changes"""
+        self.store_listener = callback
+
+    def _switch_store(self, snapshot: Snapshot) -> bool:
+        if self.store_listener is None:
+            return False
+        try:
+            self.store_listener(snapshot.store)
+        except Exception as e:
+            logger.error(f"❌ Switching to the new city data failed, keeping the current one: {e}")
+            return False
+        self.store = snapshot.store
+        self.store_digest = snapshot.store_digest
+        self._pinned = snapshot.generation
+        self.store_reloads += 1
+        logger.info(f"🔄 Switched to the city data of snapshot generation {snapshot.generation}")
+        return True
+
+    def refresh(self) -> bool:
+        """Adopt a newer generation if one was published"""
+        if CONTROL.unpack_from(self.control.buf, 0)[1] == self.generation:
+            return False
+        snapshot = self._attach()
+        if snapshot is None or snapshot.generation == self.generation:
+            return False
+        forecast = snapshot.forecast
+        if snapshot.store_digest != self.store_digest and not self._switch_store(snapshot):
+            if not self.remapped:
+                logger.warning("⚠️ Published city data changed; serving it re-mapped onto the current city list")
+            # Rows follow the new city order; put them back in ours
+            forecast = remap_forecast(forecast, snapshot.store, self.store, self.forecast)
+            self.remapped += 1
+        self.generation = snapshot.generation
+        self.forecast = forecast
+        if self.forecast_engine is not None:
+            self.forecast_engine.adopt(forecast)
+        self._release()
+        return True
+
+    def _release(self) -> None:
+        # Views from older generations may still be in use by a request; retry later if so
+        for generation in [g for g in self._segments if g not in (self._pinned, self.generation)]:
+            try:
+                self._segments[generation].close()
+            except BufferError:
+                continue
+            del self._segments[generation]
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"❌ Snapshot refresh failed: {e}")
+            await asyncio.sleep(self.poll)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "generation": self.generation,
+            "store_generation": self._pinned,
+            "attached_segments": len(self._segments),
+            "remapped": self.remapped,
+            "store_reloads": self.store_reloads,
+            "forecast_bucket": self.forecast.bucket,
+        }
@@ -0,0 +1,133 @@
+"""
+AeroHealth Spatial Index
+k-d tree over city coordinates for nearest-city and radius queries
+"""
+
+import heapq
+import math
+from typing import List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Project a lat/lon (degrees) onto the unit sphere"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord: float) -> float:
+    """Convert a straight-line distance on the unit sphere to great-circle km"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km: float) -> float:
+    """Convert a great-circle distance in km to a unit-sphere chord length"""
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in km"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+class SpatialIndex:
+    """Static 3-d tree over unit vectors
+
+    Chord length on the unit sphere grows monotonically with great-circle
+    distance, so Euclidean nearest neighbours here are great-circle
+    nearest neighbours, with no special cases at the antimeridian.
+    The tree is stored implicitly: node i sits at the median of its slice.
+    """
+
+    def __init__(self, lat: Sequence[float], lon: Sequence[float]):
+        self._points = [to_unit_vector(la, lo) for la, lo in zip(lat, lon)]
+        self._order = list(range(len(self._points)))
+        self._axes = [0] * len(self._points)
+        self._build(0, len(self._order))
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _build(self, lo: int, hi: int) -> None:
+        if hi - lo <= 0:
+            return
+        points = self._points
+        # Split on the axis with the largest spread in this slice
+        spans = []
+        for axis in range(3):
+            values = [points[i][axis] for i in self._order[lo:hi]]
+            spans.append(max(values) - min(values))
+        axis = spans.index(max(spans))
+        self._order[lo:hi] = sorted(self._order[lo:hi], key=lambda i: points[i][axis])
+        mid = (lo + hi) // 2
+        self._axes[mid] = axis
+        self._build(lo, mid)
+        self._build(mid + 1, hi)
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[int, float]]:
+        """Return up to k (city index, distance km) pairs, closest first"""
+        if k <= 0 or not self._points:
+            return []
+        target = to_unit_vector(lat, lon)
+        best: List[Tuple[float, int]] = []  # max-heap of (-dist², idx)
+        self._search_knn(0, len(self._order), target, k, best)
+        return [(idx, chord_to_km(math.sqrt(-neg))) for neg, idx in sorted(best, reverse=True)]
+
+    def within(self, lat: float, lon: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return (city index, distance km) pairs within radius_km, closest first"""
+        if radius_km < 0 or not self._points:
+            return []
+        target = to_unit_vector(lat, lon)
+        radius = km_to_chord(radius_km)
+        found: List[Tuple[float, int]] = []
+        self._search_radius(0, len(self._order), target, radius * radius, found)
+        found.sort()
+        if limit is not None:
+            found = found[:limit]
+        return [(idx, chord_to_km(math.sqrt(d2))) for d2, idx in found]
+
+    def _search_knn(self, lo: int, hi: int, target, k: int, best: list) -> None:
+        if hi <= lo:
+            return
+        mid = (lo + hi) // 2
+        idx = self._order[mid]
+        point = self._points[idx]
+        d2 = _dist2(point, target)
+        if len(best) < k:
+            heapq.heappush(best, (-d2, idx))
+        elif d2 < -best[0][0]:
+            heapq.heapreplace(best, (-d2, idx))
+
+        axis = self._axes[mid]
+        diff = target[axis] - point[axis]
+        near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+        self._search_knn(near[0], near[1], target, k, best)
+        if len(best) < k or diff * diff < -best[0][0]:
+            self._search_knn(far[0], far[1], target, k, best)
+
+    def _search_radius(self, lo: int, hi: int, target, r2: float, found: list) -> None:
+        if hi <= lo:
+            return
+        mid = (lo + hi) // 2
+        idx = self._order[mid]
+        point = self._points[idx]
+        d2 = _dist2(point, target)
+        if d2 <= r2:
+            found.append((d2, idx))
+
+        axis = self._axes[mid]
+        diff = target[axis] - point[axis]
+        if diff < 0 or diff * diff <= r2:
+            self._search_radius(lo, mid, target, r2, found)
+        if diff >= 0 or diff * diff <= r2:
+            self._search_radius(mid + 1, hi, target, r2, found)
+
+
+def _dist2(a, b) -> float:
+    dx, dy, dz = a[0] - b[0], a[1] - b[1], a[2] - b[2]
+    return dx * dx + dy * dy + dz * dz
@@ -0,0 +1,157 @@
+"""
+AeroHealth Live Streaming
+One shared producer computes each tick and fans deltas out to subscribers
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STREAM_INTERVAL = float(os.environ.get("AEROHEALTH_STREAM_INTERVAL", "5"))
+STREAM_QUEUE_SIZE = int(os.environ.get("AEROHEALTH_STREAM_QUEUE_SIZE", "16"))
+MAX_SUBSCRIBERS = int(os.environ.get("AEROHEALTH_STREAM_MAX_SUBSCRIBERS", "10000"))
+
+# compute(indices) -> {city index: JSON-serializable reading}
+ComputeFn = Callable[[List[int]], Dict[int, dict]]
+
+
+def format_event(event: str, data: str) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """A connected client: its city set and a bounded queue of encoded events"""
+
+    def __init__(self, cities: Iterable[int], maxsize: int = STREAM_QUEUE_SIZE):
+        self.cities: Set[int] = set(cities)
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+
+class StreamHub:
+    """Single producer, many consumers
+
+    Every tick computes the union of subscribed cities exactly once, keeps one
+    pre-encoded JSON fragment per changed city and stitches those fragments into
+    each subscriber's delta. A subscriber whose queue is full is not allowed to
+    stall the producer: its backlog is discarded and replaced by one snapshot
+    of its cities, so a slow client resynchronises instead of growing memory.
+    """
+
+    def __init__(self, compute: ComputeFn, interval: float = STREAM_INTERVAL,
+                 queue_size: int = STREAM_QUEUE_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.compute = compute
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscription] = set()
+        self.ticks = 0
+        self.computed_cities = 0
+        self._latest: Dict[int, dict] = {}
+        self._fragments: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, cities: Iterable[int]) -> Subscription:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise OverflowError("Too many stream subscribers")
+        sub = Subscription(cities, self.queue_size)
+        missing = [idx for idx in sub.cities if idx not in self._fragments]
+        if missing:
+            self._store(self.compute(missing))
+        self.subscribers.add(sub)
+        sub.queue.put_nowait(self._snapshot(sub))
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+
+    def remap(self, mapping: Dict[int, int]) -> None:
+        """Move subscriptions onto a new city list; cities missing from `mapping` are dropped
+
+        Every watched city is recomputed and sent as a delta on the next tick.
+        """
+        for sub in self.subscribers:
+            sub.cities = {mapping[idx] for idx in sub.cities if idx in mapping}
+        self._latest.clear()
+        self._fragments.clear()
+
+    def tick(self) -> None:
+        """Compute every subscribed city once and publish what changed"""
+        wanted = set()
+        for sub in self.subscribers:
+            wanted |= sub.cities
+        # Drop cities nobody is watching any more
+        for idx in [idx for idx in self._latest if idx not in wanted]:
+            del self._latest[idx]
+            del self._fragments[idx]
+        if not wanted:
+            return
+
+        self.ticks += 1
+        self.computed_cities += len(wanted)
+        readings = self.compute(sorted(wanted))
+        changed = {idx for idx, reading in readings.items() if self._latest.get(idx) != reading}
+        if not changed:
+            return
+        self._store({idx: readings[idx] for idx in changed})
+
+        for sub in self.subscribers:
+            mine = [self._fragments[idx] for idx in sub.cities if idx in changed]
+            if mine:
+                self._publish(sub, format_event("delta", self._envelope("delta", mine)))
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"❌ Stream tick failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self.subscribers),
+            "watched_cities": len(self._latest),
+            "ticks": self.ticks,
+            "computed_cities": self.computed_cities,
+            "dropped_events": sum(sub.dropped for sub in self.subscribers),
+        }
+
+    def _store(self, readings: Dict[int, dict]) -> None:
+        for idx, reading in readings.items():
+            self._latest[idx] = reading
+            self._fragments[idx] = json.dumps(reading, ensure_ascii=False, separators=(",", ":"))
+
+    def _snapshot(self, sub: Subscription) -> str:
+        fragments = [self._fragments[idx] for idx in sub.cities if idx in self._fragments]
+        return format_event("snapshot", self._envelope("snapshot", fragments))
+
+    def _envelope(self, kind: str, fragments: List[str]) -> str:
+        return f'{{"type":"{kind}","tick":{self.ticks},"readings":[{",".join(fragments)}]}}'
+
+    def _publish(self, sub: Subscription, message: str) -> None:
+        try:
+            sub.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+                sub.dropped += 1
+            sub.queue.put_nowait(self._snapshot(sub))
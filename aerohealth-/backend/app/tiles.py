@@ -0,0 +1,108 @@
+"""
+AeroHealth Heatmap Tiles
+Inverse-distance-weighted AQI fields rendered as quantized uint8 XYZ tiles
+"""
+
+import math
+import os
+from typing import Sequence
+
+from spatial import SpatialIndex, haversine_km
+
+TILE_SIZE = int(os.environ.get("AEROHEALTH_TILE_SIZE", "64"))
+MAX_ZOOM = 12
+# Cities that contribute to each pixel, and how far their influence reaches
+IDW_NEIGHBOURS = 6
+IDW_POWER = 2
+IDW_MAX_KM = 300.0
+# Exact IDW evaluations per tile edge; pixels in between are bilinear
+LATTICE = 16
+# At coarse zooms a lattice cell spans more than IDW_MAX_KM; reach is then
+# widened to this many cell diagonals so cities still colour nearby nodes
+IDW_REACH_CELLS = 1.0
+# Pixel value v encodes AQI v * AQI_SCALE; 0 means no nearby data
+AQI_SCALE = 300 / 255
+
+
+def pixel_lat_lon(z: int, x: int, y: int, px: float, py: float, size: int = TILE_SIZE):
+    """Latitude/longitude of a (fractional) pixel center in Web Mercator tile z/x/y"""
+    n = 2 ** z
+    lon = (x + (px + 0.5) / size) / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + (py + 0.5) / size) / n))))
+    return lat, lon
+
+
+def quantize(aqi: float) -> int:
+    return max(1, min(255, round(aqi / AQI_SCALE)))
+
+
+def idw(index: SpatialIndex, aqi: Sequence[int], lat: float, lon: float, max_km: float = IDW_MAX_KM) -> float:
+    """Inverse-distance-weighted AQI at a point, or 0.0 with no city in reach"""
+    total = weight = 0.0
+    for idx, km in index.nearest(lat, lon, IDW_NEIGHBOURS):
+        if km > max_km:
+            break
+        if km < 1.0:
+            return float(aqi[idx])
+        w = km ** -IDW_POWER
+        total += w * aqi[idx]
+        weight += w
+    return total / weight if weight else 0.0
+
+
+def render_tile(index: SpatialIndex, aqi: Sequence[int], z: int, x: int, y: int,
+                size: int = TILE_SIZE, lattice: int = LATTICE) -> bytes:
+    """Interpolate AQI across a tile and return size * size bytes, row-major
+
+    The IDW field is smooth, so it is evaluated exactly on a
+    (lattice + 1)^2 grid of points and bilinearly filled in between, which
+    needs ~(size / lattice)^2 times fewer neighbour searches.
+    """
+    out = bytearray(size * size)
+    lattice = max(1, min(lattice, size - 1))
+    span = (size - 1) / lattice
+
+    # Reach per lattice row: Mercator ground scale only depends on latitude
+    reach = []
+    for j in range(lattice + 1):
+        row = min(j, lattice - 1)
+        lat, lon = pixel_lat_lon(z, x, y, 0, row * span, size)
+        next_lat, next_lon = pixel_lat_lon(z, x, y, span, (row + 1) * span, size)
+        reach.append(max(IDW_MAX_KM, IDW_REACH_CELLS * haversine_km(lat, lon, next_lat, next_lon)))
+
+    # Skip tiles that no city can reach (oceans, other continents)
+    center_lat, center_lon = pixel_lat_lon(z, x, y, (size - 1) / 2, (size - 1) / 2, size)
+    corner_lat, corner_lon = pixel_lat_lon(z, x, y, 0, 0, size)
+    closest = index.nearest(center_lat, center_lon, 1)
+    if not closest or closest[0][1] > max(reach) + haversine_km(center_lat, center_lon, corner_lat, corner_lon):
+        return bytes(out)
+
+    grid = [
+        [idw(index, aqi, *pixel_lat_lon(z, x, y, i * span, j * span, size), reach[j]) for i in range(lattice + 1)]
+        for j in range(lattice + 1)
+    ]
+
+    pos = 0
+    for py in range(size):
+        fy = py / span
+        j0 = min(int(fy), lattice - 1)
+        ty = fy - j0
+        top, bottom = grid[j0], grid[j0 + 1]
+        for px in range(size):
+            fx = px / span
+            i0 = min(int(fx), lattice - 1)
+            tx = fx - i0
+            total = weight = 0.0
+            for value, w in ((top[i0], (1 - tx) * (1 - ty)), (top[i0 + 1], tx * (1 - ty)),
+                             (bottom[i0], (1 - tx) * ty), (bottom[i0 + 1], tx * ty)):
+                if value and w > 0:
+                    total += value * w
+                    weight += w
+            if weight:
+                out[pos] = quantize(total / weight)
+            pos += 1
+    return bytes(out)
+
+
+def tile_in_range(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
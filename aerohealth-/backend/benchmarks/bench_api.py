@@ -0,0 +1,304 @@
+"""
+AeroHealth API Benchmarks
+Drives every route in-process (ASGI transport) and over a real socket; saves JSON results
+
+Usage (from aerohealth-/backend):
+    python benchmarks/bench_api.py                          # both modes, all routes
+    python benchmarks/bench_api.py --mode asgi -c 32 -n 2000 --routes current,batch
+    python benchmarks/bench_api.py --save-baseline          # store results as the baseline
+    python benchmarks/bench_api.py --compare                # exit 1 on regression vs baseline
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+CITIES = ["Delhi", "Mumbai", "Lucknow", "Kolkata", "Chennai", "Bangalore", "Jaipur", "Patna", "Pune", "Kanpur"]
+TILES = [(5, 22, 13), (5, 22, 14), (5, 23, 13), (6, 45, 27), (6, 46, 27)]
+PROFILES = [
+    {"id": str(i), "city": CITIES[i % len(CITIES)], "age_group": ["child", "adult", "senior"][i % 3],
+     "conditions": [["asthma"], [], ["heart disease", "respiratory"], ["copd"]][i % 4],
+     "activity_level": ["low", "moderate", "high"][i % 3]}
+    for i in range(1000)
+]
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    # Called with the request number so scenarios can rotate through inputs
+    path: Callable[[int], str]
+    body: Optional[dict] = None
+    # Streaming routes never finish; they are timed to the first event instead
+    stream: bool = False
+
+
+SCENARIOS = [
+    Scenario("root", "GET", lambda i: "/"),
+    Scenario("current", "GET", lambda i: f"/api/v1/air-quality/current?city={CITIES[i % len(CITIES)]}"),
+    Scenario("batch", "POST", lambda i: "/api/v1/air-quality/batch", {}),
+    Scenario("stream", "GET", lambda i: "/api/v1/air-quality/stream?cities=Delhi,Mumbai,Lucknow", stream=True),
+    Scenario("nearest", "GET", lambda i: "/api/v1/air-quality/nearest?lat=28.61&lon=77.21&k=5"),
+    Scenario("within", "GET", lambda i: "/api/v1/air-quality/within?lat=19.07&lon=72.88&radius_km=300"),
+    Scenario("tiles", "GET", lambda i: "/api/v1/tiles/{}/{}/{}".format(*TILES[i % len(TILES)])),
+    Scenario("cities", "GET", lambda i: "/api/v1/cities"),
+    Scenario("rankings", "GET", lambda i: "/api/v1/rankings?order=worst&k=10"),
+    Scenario("aggregates", "GET", lambda i: "/api/v1/aggregates"),
+    Scenario("history", "GET", lambda i: f"/api/v1/history?city={CITIES[i % len(CITIES)]}"),
+    Scenario("health", "GET", lambda i: f"/api/v1/health?city={CITIES[i % len(CITIES)]}&age_group=senior&conditions=asthma"),
+    Scenario("health_batch", "POST", lambda i: "/api/v1/health/batch", {"profiles": PROFILES}),
+    Scenario("nasa", "GET", lambda i: "/api/v1/nasa"),
+    Scenario("forecast", "GET", lambda i: f"/api/v1/forecast?city={CITIES[i % len(CITIES)]}"),
+    Scenario("forecast_bulk", "GET", lambda i: "/api/v1/forecast/bulk?days=7"),
+    Scenario("compare", "GET", lambda i: f"/api/v1/compare?cities={','.join(CITIES)}"),
+    Scenario("metrics", "GET", lambda i: "/metrics"),
+    Scenario("healthz", "GET", lambda i: "/health"),
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Resident set size of a process in MiB (Linux /proc; own peak RSS elsewhere)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except OSError:
+        if pid is not None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10, 1)
+
+
+async def one_request(client: httpx.AsyncClient, scenario: Scenario, i: int) -> bool:
+    if scenario.stream:
+        async with client.stream("GET", scenario.path(i)) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    return response.status_code == 200
+        return False
+    response = await client.request(scenario.method, scenario.path(i), json=scenario.body)
+    return response.status_code < 400
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int,
+                       concurrency: int, warmup: int, server_pid: Optional[int]) -> Dict:
+    for i in range(warmup):
+        await one_request(client, scenario, i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await one_request(client, scenario, i)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "rss_mb": rss_mb(server_pid),
+    }
+
+
+async def run_suite(client: httpx.AsyncClient, scenarios: List[Scenario], args, server_pid: Optional[int] = None) -> Dict:
+    results = {}
+    for scenario in scenarios:
+        # Streams hold a subscriber each; keep their count modest
+        concurrency = min(args.concurrency, 16) if scenario.stream else args.concurrency
+        requests = min(args.requests, 200) if scenario.stream else args.requests
+        result = await run_scenario(client, scenario, requests, concurrency, args.warmup, server_pid)
+        results[scenario.name] = result
+        print(f"  {scenario.name:<14} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f}ms  "
+              f"p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+              f"rss {result['rss_mb']}MiB  errors {result['errors']}")
+    return results
+
+
+async def bench_asgi(scenarios: List[Scenario], args) -> Dict:
+    """In-process: no sockets, measures the app and framework alone"""
+    sys.path.insert(0, str(APP_DIR))
+    # Importing main configures logging; keep the client's per-request lines out of the timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from main import app
+
+    # httpx's ASGI transport buffers whole bodies, so endless streams cannot run here
+    scenarios = [s for s in scenarios if not s.stream]
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_suite(client, scenarios, args)
+    finally:
+        await app.router.shutdown()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def bench_socket(scenarios: List[Scenario], args) -> Dict:
+    """Over loopback TCP against a separate uvicorn process"""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", args.log_level.lower(), "--no-access-log"],
+        cwd=APP_DIR, env=os.environ.copy()
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.2)
+            return await run_suite(client, scenarios, args, server.pid)
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (fractional) in throughput or p95 latency"""
+    regressions = []
+    for mode, scenarios in results["results"].items():
+        for name, current in scenarios.items():
+            previous = baseline.get("results", {}).get(mode, {}).get(name)
+            if previous is None:
+                continue
+            if current["rps"] < previous["rps"] * (1 - tolerance):
+                regressions.append(f"{mode}/{name}: {previous['rps']} -> {current['rps']} req/s")
+            if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="AeroHealth API benchmarks")
+    parser.add_argument("--mode", choices=["asgi", "socket", "both"], default="both")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="Requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per route")
+    parser.add_argument("--routes", help="Comma-separated scenario names (default: all)")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Also write results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="Exit 1 when a route regresses past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional regression (default 0.2)")
+    parser.add_argument("--log-level", default="WARNING", help="App log level while measuring (default WARNING)")
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        unknown = wanted - {s.name for s in SCENARIOS}
+        if unknown:
+            parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+        scenarios = [s for s in SCENARIOS if s.name in wanted]
+
+    # Keep benchmark runs from touching the real history file
+    os.environ.setdefault("AEROHEALTH_HISTORY_FILE", str(Path(tempfile.mkdtemp()) / "history.bin"))
+    # Measure the API rather than console I/O, in-process and in the uvicorn child alike
+    os.environ["AEROHEALTH_LOG_LEVEL"] = args.log_level.upper()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": {},
+    }
+    for mode, bench in (("asgi", bench_asgi), ("socket", bench_socket)):
+        if args.mode in (mode, "both"):
+            print(f"🏁 {mode} ({args.concurrency} concurrent, {args.requests} requests per route)")
+            results["results"][mode] = asyncio.run(bench(scenarios, args))
+
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"💾 Results saved to {output}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"📌 Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"⚠️ No baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "app"
+sys.path.insert(0, str(APP_DIR))
+
+# Keep the history ring buffers out of the repo's data directory
+os.environ.setdefault("AEROHEALTH_HISTORY_FILE", str(Path(tempfile.mkdtemp()) / "history.bin"))
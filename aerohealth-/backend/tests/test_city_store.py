@@ -0,0 +1,44 @@
+import logging
+
+from city_store import CITY_DATASET, CityStore
+
+ENTRY = '{{ name: "{name}", state: "Kerala", lat: 10.5, lon: 76.2, population: 1000, tier: 5, region: "Southern", aqi_base: {aqi} }}'
+
+
+def write_dataset(tmp_path, *entries: str):
+    path = tmp_path / "cities.js"
+    path.write_text("const INDIAN_CITIES_500 = [\n" + ",\n".join(f"    {entry}" for entry in entries) + "\n];\n")
+    return path
+
+
+def test_entries_parse_in_any_field_order(tmp_path):
+    path = write_dataset(
+        tmp_path,
+        '{ aqi_base: 40, region: "Southern", tier: 5, population: 900, lon: 76.6, lat: 8.9, state: "Kerala", name: "Kollam" }',
+    )
+    store = CityStore.from_js(path)
+    assert store.names == ["Kollam"]
+    assert (store.lat[0], store.base_aqi[0], store.state(0)) == (8.9, 40, "Kerala")
+
+
+def test_unparseable_and_duplicate_entries_are_reported(tmp_path, caplog):
+    path = write_dataset(
+        tmp_path,
+        ENTRY.format(name="Thrissur", aqi=45),
+        '{ name: "Kannur", state: "Kerala", lat: 11.8, lon: 75.3 }',
+        ENTRY.format(name="Thrissur", aqi=99),
+    )
+    with caplog.at_level(logging.WARNING, logger="city_store"):
+        store = CityStore.from_js(path)
+
+    assert store.names == ["Thrissur"]
+    assert store.base_aqi[0] == 45
+    messages = " ".join(record.getMessage() for record in caplog.records)
+    assert "cities.js:3: missing region, tier, population, aqi_base" in messages
+    assert "duplicate city Thrissur at cities.js:4 (first defined on line 2)" in messages
+
+
+def test_bundled_dataset_reports_its_duplicate(caplog):
+    with caplog.at_level(logging.WARNING, logger="city_store"):
+        CityStore.from_js(CITY_DATASET)
+    assert any("duplicate city Firozabad" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+import main
+from comparison import delta_matrix
+
+
+def test_delta_matrix_scaled():
+    assert delta_matrix([1500, 250], 1000) == [[0.0, 1.25], [-1.25, 0.0]]
+
+
+def test_compare_aod_matches_current(monkeypatch):
+    delhi = main.city_store.index["Delhi"]
+    monkeypatch.setattr(main.aod_window, "city_aod", lambda idx: (0.777, 0.8) if idx == delhi else None)
+    client = TestClient(main.app)
+
+    compared = client.get("/api/v1/compare", params={"cities": "Delhi,Mumbai"}).json()
+    for city, aod in zip(compared["cities"], compared["values"]["aod"]):
+        current = client.get("/api/v1/air-quality/current", params={"city": city}).json()
+        assert current["nasa_satellite"]["average_aod"] == aod
+    assert compared["values"]["aod"][0] == 0.777
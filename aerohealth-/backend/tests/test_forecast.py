@@ -0,0 +1,38 @@
+from array import array
+
+import pytest
+
+from city_store import load_city_store
+from forecast import ForecastEngine, ForecastMatrix
+from readings import ReadingFeed
+from simulation import CitySample, SimulationEngine
+
+
+def test_forecast_starts_from_observed_reading():
+    store = load_city_store()
+    simulation = SimulationEngine()
+    feed = ReadingFeed(store, simulation)
+    engine = ForecastEngine(store, simulation, feed=feed)
+    feed.subscribe(engine)
+    delhi, mumbai = store.index["Delhi"], store.index["Mumbai"]
+
+    before = engine.matrix().row(delhi).tolist()
+    untouched = engine.matrix().row(mumbai).tolist()
+    feed.observe(delhi, CitySample(42, 20.0, 0.2, 30))
+    after = engine.matrix().row(delhi).tolist()
+
+    expected = simulation.forecast("Delhi", 42, engine.days, simulation.bucket())[1]
+    assert after == list(expected)
+    assert after != before
+    assert engine.matrix().row(mumbai).tolist() == untouched
+    # The observed row was redone in place; the matrix was not rebuilt
+    assert engine.builds == 1
+    assert engine.row_updates == 1
+
+
+def test_adopt_rejects_mismatched_matrix():
+    store = load_city_store()
+    engine = ForecastEngine(store, SimulationEngine())
+    matrix = ForecastMatrix(0, engine.days, array("H", [0] * engine.days * 2), array("B", [0, 0]))
+    with pytest.raises(ValueError):
+        engine.adopt(matrix)
@@ -0,0 +1,19 @@
+from history import HistoryStore
+
+
+def test_trend_reads_the_newest_window_across_the_wrap(tmp_path):
+    store = HistoryStore(["A"], path=tmp_path / "history.bin", capacity=8)
+    # 20 readings wrap the 8-slot ring; only the last 6 (rising steeply) matter
+    for t, aqi in enumerate([300] * 14 + [100, 100, 100, 150, 150, 150]):
+        store.append(0, t, aqi, 50, 0.5)
+    assert store.trend(0, window=6) == "slightly worsening"
+    assert [r.aqi for r in store.records(0)][-6:] == [100, 100, 100, 150, 150, 150]
+    store.close()
+
+
+def test_trend_with_few_records(tmp_path):
+    store = HistoryStore(["A"], path=tmp_path / "history.bin", capacity=8)
+    assert store.trend(0) == "stable"
+    store.append(0, 1, 100, 50, 0.5)
+    assert store.trend(0) == "stable"
+    store.close()
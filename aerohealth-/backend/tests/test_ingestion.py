@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from city_store import load_city_store
+from ingestion import CircuitBreaker, IngestionService, Observation, UpstreamSource
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def tripped_breaker(clock: FakeClock) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=2, reset_after=30, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30
+    return breaker
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    clock = FakeClock()
+    breaker = tripped_breaker(clock)
+    assert breaker.state == "half-open"
+    assert [breaker.allow() for _ in range(5)] == [True, False, False, False, False]
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 30
+    assert [breaker.allow() for _ in range(3)] == [True, False, False]
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert all(breaker.allow() for _ in range(5))
+
+
+def test_unreported_trial_expires():
+    clock = FakeClock()
+    breaker = tripped_breaker(clock)
+    assert breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+class SlowSource(UpstreamSource):
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch(self, client, city, lat, lon):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return Observation(42, 30, 0.2)
+
+
+def test_concurrent_fetches_send_one_trial_while_half_open():
+    store = load_city_store()
+    source = SlowSource()
+    service = IngestionService(store, lambda idx, sample: None, [source])
+    clock = FakeClock()
+    service.breakers[source.name] = tripped_breaker(clock)
+
+    async def fetch_many():
+        return await asyncio.gather(*(service._fetch(source, idx) for idx in range(5)))
+
+    results = asyncio.run(fetch_many())
+    assert source.calls == 1
+    assert sum(result is not None for result in results) == 1
+    assert service.breakers[source.name].state == "closed"
+
+
+def test_concurrent_on_demand_refreshes_share_one_fetch():
+    store = load_city_store()
+    source = SlowSource()
+    published = []
+    service = IngestionService(store, lambda idx, sample: published.append((idx, sample)), [source])
+    delhi = store.index["Delhi"]
+
+    async def refresh_many():
+        return await asyncio.gather(*(service.refresh_city(delhi) for _ in range(5)))
+
+    assert asyncio.run(refresh_many()) == [True] * 5
+    assert source.calls == 1
+    assert service.singleflight.coalesced == 4
+    assert [idx for idx, _ in published] == [delhi]
+    # Asked again right away, the city is not fetched a second time
+    assert not asyncio.run(service.refresh_city(delhi))
+    assert source.calls == 1
+
+
+def test_scheduled_refresh_does_not_block_the_caller():
+    store = load_city_store()
+    source = SlowSource()
+    published = []
+    service = IngestionService(store, lambda idx, sample: published.append(idx), [source])
+    delhi = store.index["Delhi"]
+
+    async def request_then_settle():
+        started = [service.schedule_refresh(delhi) for _ in range(3)]
+        # Nothing has been fetched yet when the request would respond
+        assert published == []
+        await asyncio.gather(*service._background.values())
+        return started
+
+    assert asyncio.run(request_then_settle()) == [True, False, False]
+    assert published == [delhi]
+    assert source.calls == 1
+
+
+def test_source_adapters_must_implement_fetch():
+    class Incomplete(UpstreamSource):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,39 @@
+import logging
+import queue
+
+from logs import BoundedQueueHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def record(level: int) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, "message", None, None)
+
+
+def test_full_queue_drops_info_and_writes_errors_directly():
+    fallback = ListHandler()
+    handler = BoundedQueueHandler(queue.Queue(1), fallback)
+    handler.enqueue(record(logging.INFO))
+
+    handler.enqueue(record(logging.INFO))
+    handler.enqueue(record(logging.WARNING))
+    handler.enqueue(record(logging.ERROR))
+
+    assert handler.dropped == 1
+    assert handler.direct_writes == 2
+    assert [r.levelno for r in fallback.records] == [logging.WARNING, logging.ERROR]
+
+
+def test_errors_use_the_queue_while_there_is_room():
+    fallback = ListHandler()
+    handler = BoundedQueueHandler(queue.Queue(1), fallback)
+    handler.enqueue(record(logging.ERROR))
+    assert handler.queue.get_nowait().levelno == logging.ERROR
+    assert fallback.records == []
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_metrics_content_type_has_a_single_charset():
+    with TestClient(main.app) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert "aerohealth_http_requests_total" in response.text
+
+
+def test_profile_content_type():
+    main.profiler.interval = 0.01
+    try:
+        with TestClient(main.app) as client:
+            response = client.get("/metrics/profile")
+    finally:
+        main.profiler.interval = 0.0
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
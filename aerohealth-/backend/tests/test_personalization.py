@@ -0,0 +1,22 @@
+import json
+from pathlib import Path
+
+from personalization import personalization_engine
+
+# [age, conditions, activity level, AQI, recommendations, alerts], as returned by
+# getPersonalizedHealthAdvice in frontend/js/ultra-powerful-ai.js for these inputs
+BROWSER_ADVICE = json.loads((Path(__file__).parent / "data" / "browser_advice.json").read_text())
+
+
+def test_advice_matches_the_browser():
+    for age, conditions, activity, aqi, recommendations, alerts in BROWSER_ADVICE:
+        profile = personalization_engine.compile_profile(age, conditions, activity)
+        advice = personalization_engine.evaluate(profile, aqi)
+        assert (list(advice.recommendations), list(advice.alerts)) == (recommendations, alerts), \
+            (age, conditions, activity, aqi)
+
+
+def test_server_only_conditions_add_advice():
+    profile = personalization_engine.compile_profile("adult", ["pregnant"])
+    advice = personalization_engine.evaluate(profile, 120)
+    assert "Pregnancy alert - reduce exposure to outdoor air" in advice.alerts
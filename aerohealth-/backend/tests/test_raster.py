@@ -0,0 +1,21 @@
+import os
+
+from city_store import load_city_store
+from raster import AODWindow, write_grid
+
+
+def test_grid_regenerated_under_the_same_date_is_re_read(tmp_path):
+    store = load_city_store()
+    path = tmp_path / "aod_20240101.bin"
+    # Corners spanning all of India
+    write_grid(path, 20240101, 5.0, 65.0, 35.0, 35.0, [[0.4, 0.4], [0.4, 0.4]])
+    window = AODWindow(store, str(tmp_path))
+    window.reload()
+    delhi = store.index["Delhi"]
+    assert window.city_aod(delhi) == (0.4, 0.4)
+
+    write_grid(path, 20240101, 5.0, 65.0, 35.0, 35.0, [[0.9, 0.9], [0.9, 0.9]])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    window.reload()
+    assert window.city_aod(delhi) == (0.9, 0.9)
@@ -0,0 +1,23 @@
+from city_store import load_city_store
+from readings import ReadingFeed
+from simulation import CitySample, SimulationEngine
+
+
+def test_refresh_keeps_fresh_upstream_observations():
+    store = load_city_store()
+    now = [1_000_000.0]
+    simulation = SimulationEngine(interval=300)
+    feed = ReadingFeed(store, simulation, max_age=900, clock=lambda: now[0])
+    delhi = store.index["Delhi"]
+    bucket = simulation.bucket(now[0])
+
+    feed.refresh(bucket)
+    observed = CitySample(42, 0.2, 0.2, 30)
+    feed.observe(delhi, observed)
+
+    feed.refresh(bucket + 1)
+    assert feed.latest[delhi] == observed
+
+    now[0] += 901
+    feed.refresh(bucket + 4)
+    assert feed.latest[delhi] == simulation.sample("Delhi", store.base_aqi[delhi], bucket + 4)
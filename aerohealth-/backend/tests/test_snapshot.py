@@ -0,0 +1,65 @@
+from city_store import CityStore, load_city_store
+from forecast import ForecastEngine
+from simulation import simulation_engine
+from snapshot import SnapshotFollower, SnapshotPublisher
+
+
+def reversed_store(store: CityStore) -> CityStore:
+    reordered = CityStore()
+    for idx in reversed(range(len(store))):
+        reordered.add(*store.info(idx))
+    return reordered
+
+
+def test_follower_keeps_city_rows_when_published_order_changes():
+    store = load_city_store()
+    reordered = reversed_store(store)
+    bucket = simulation_engine.bucket()
+    original = ForecastEngine(store, simulation_engine).build(bucket)
+    delhi = store.index["Delhi"]
+    assert reordered.index["Delhi"] != delhi
+
+    publisher = SnapshotPublisher(prefix=f"aerohealth_test_{id(store)}")
+    try:
+        publisher.publish(store.to_bytes(), original)
+        follower = SnapshotFollower(publisher.name)
+        engine = ForecastEngine(follower.store, simulation_engine)
+        follower.follow(engine)
+        before = follower.forecast.row(delhi).tolist()
+
+        publisher.publish(reordered.to_bytes(), ForecastEngine(reordered, simulation_engine).build(bucket))
+        assert follower.refresh()
+
+        assert follower.forecast.row(delhi).tolist() == before
+        assert engine.matrix(bucket).row(delhi).tolist() == before
+        assert follower.stats()["remapped"] == 1
+    finally:
+        publisher.close()
+
+
+def test_follower_switches_store_in_place_when_a_listener_is_registered():
+    store = load_city_store()
+    reordered = reversed_store(store)
+    bucket = simulation_engine.bucket()
+    published = ForecastEngine(reordered, simulation_engine).build(bucket)
+
+    publisher = SnapshotPublisher(prefix=f"aerohealth_test_switch_{id(store)}")
+    try:
+        publisher.publish(store.to_bytes(), ForecastEngine(store, simulation_engine).build(bucket))
+        follower = SnapshotFollower(publisher.name)
+        engine = ForecastEngine(follower.store, simulation_engine)
+        follower.follow(engine)
+        switched = []
+        follower.on_store_change(lambda new: (switched.append(new), engine.rebind(new)))
+
+        publisher.publish(reordered.to_bytes(), published)
+        assert follower.refresh()
+
+        assert [list(new.names) for new in switched] == [list(reordered.names)]
+        assert list(follower.store.names) == list(reordered.names)
+        delhi = reordered.index["Delhi"]
+        assert engine.matrix(bucket).row(delhi).tolist() == published.row(delhi).tolist()
+        assert follower.stats()["store_reloads"] == 1
+        assert follower.stats()["remapped"] == 0
+    finally:
+        publisher.close()
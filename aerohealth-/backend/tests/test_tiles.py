@@ -0,0 +1,32 @@
+from city_store import load_city_store
+from spatial import SpatialIndex
+from tiles import render_tile
+
+
+def test_low_zoom_tile_covering_india_is_not_empty():
+    store = load_city_store()
+    index = SpatialIndex(store.lat, store.lon)
+    # z=1, x=1, y=0 spans 0-180E, 0-85N
+    tile = render_tile(index, list(store.base_aqi), 1, 1, 0)
+    assert sum(1 for value in tile if value) > 100
+
+
+def test_tile_without_cities_stays_empty():
+    store = load_city_store()
+    index = SpatialIndex(store.lat, store.lon)
+    assert not any(render_tile(index, list(store.base_aqi), 1, 0, 0))
+
+
+def test_tile_changes_when_an_observation_arrives_mid_bucket():
+    from fastapi.testclient import TestClient
+
+    import main
+    from simulation import CitySample
+
+    client = TestClient(main.app)
+    before = client.get("/api/v1/tiles/5/22/13")
+    main.reading_feed.observe(main.city_store.index["Delhi"], CitySample(480, 3.0, 3.0, 400))
+    after = client.get("/api/v1/tiles/5/22/13")
+
+    assert after.headers["etag"] != before.headers["etag"]
+    assert after.content != before.content
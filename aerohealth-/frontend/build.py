@@ -0,0 +1,357 @@
+"""
+AeroHealth Frontend Build
+Minified, content-hashed bundles and a rewritten index.html in dist/, described by a manifest
+"""
+
+import hashlib
+import json
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FRONTEND_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = FRONTEND_DIR.parent.parent
+DIST_DIR = FRONTEND_DIR / "dist"
+ASSETS_DIR = "assets"
+MANIFEST_NAME = "manifest.json"
+
+# Bundle name -> sources, in load order. The city data stays top level
+# (the modules read its globals); each module runs in its own function
+# scope and publishes itself on window, as it already does.
+BUNDLES: Dict[str, List[str]] = {
+    "aerohealth.js": [
+        "data/cities-500.js",
+        "js/ultra-powerful-ai.js",
+        "js/prediction-engine.js",
+        "js/nasa-globe-3d.js",
+    ],
+    "styles.css": ["css/styles.css"],
+}
+TOP_LEVEL_SOURCES = ("data/cities-500.js",)
+
+HASH_LENGTH = 10
+
+
+# ---------------------------------------------------------------------------
+# Minifiers: whitespace and comments only, never renaming, so the output
+# behaves exactly like the source.
+# ---------------------------------------------------------------------------
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.S)
+_CSS_TIGHT = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(source: str) -> str:
+    """Drop comments, collapse whitespace and trim it around punctuation, leaving strings untouched"""
+    parts = []
+    code = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(source):
+        code.append(source[position:match.start()])
+        string, comment, space = match.groups()
+        if string:
+            parts.append(_tighten_css("".join(code)))
+            parts.append(string)
+            code = []
+        elif comment:
+            code.append(" ")
+        else:
+            code.append(" ")
+        position = match.end()
+    code.append(source[position:])
+    parts.append(_tighten_css("".join(code)))
+    return "".join(parts).strip().replace(";}", "}")
+
+
+def _tighten_css(code: str) -> str:
+    code = re.sub(r"\s+", " ", code)
+    code = _CSS_TIGHT.sub(r"\1", code)
+    return re.sub(r":\s+", ":", code)
+
+
+_WORD = re.compile(r"[\w$\u0080-\uffff]")
+# After these, a "/" starts a regular expression rather than a division
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+                   "void", "throw", "instanceof", "yield", "await"}
+
+
+class _JSMinifier:
+    """Single pass over JS source: copies strings, templates and regex literals verbatim,
+    drops comments and collapses whitespace. Line breaks are kept wherever automatic
+    semicolon insertion could depend on them."""
+
+    def __init__(self, source: str):
+        self.src = source
+        self.pos = 0
+        self.out: List[str] = []
+        # "{" depth per open template substitution
+        self.template_depth: List[int] = []
+        self.depth = 0
+        self.pending = ""  # whitespace waiting for the next token: "", " " or "\n"
+
+    def run(self) -> str:
+        src = self.src
+        while self.pos < len(src):
+            ch = src[self.pos]
+            nxt = src[self.pos + 1] if self.pos + 1 < len(src) else ""
+            if ch in " \t\r\n\f\v\u00a0\ufeff":
+                self._space("\n" if ch == "\n" else " ")
+                self.pos += 1
+            elif ch == "/" and nxt == "/":
+                end = src.find("\n", self.pos)
+                self.pos = len(src) if end < 0 else end
+            elif ch == "/" and nxt == "*":
+                end = src.find("*/", self.pos + 2)
+                end = len(src) if end < 0 else end + 2
+                self._space("\n" if "\n" in src[self.pos:end] else " ")
+                self.pos = end
+            elif ch == "/" and self._regex_allowed():
+                self._emit(self._scan_regex())
+            elif ch in "'\"":
+                self._emit(self._scan_string(ch))
+            elif ch == "`":
+                self.pos += 1
+                self._emit("`" + self._scan_template())
+            elif ch == "{":
+                self.depth += 1
+                self._emit(ch)
+                self.pos += 1
+            elif ch == "}":
+                if self.template_depth and self.template_depth[-1] == self.depth:
+                    self.template_depth.pop()
+                    self.depth -= 1
+                    self.pending = ""
+                    self.out.append("}")
+                    self.pos += 1
+                    self.out.append(self._scan_template())
+                else:
+                    self.depth -= 1
+                    self._emit(ch)
+                    self.pos += 1
+            else:
+                match = _WORD.match(ch)
+                if match:
+                    end = self.pos + 1
+                    while end < len(src) and _WORD.match(src[end]):
+                        end += 1
+                    self._emit(src[self.pos:end])
+                    self.pos = end
+                else:
+                    self._emit(ch)
+                    self.pos += 1
+        return "".join(self.out).strip()
+
+    def _space(self, kind: str) -> None:
+        if kind == "\n" or not self.pending:
+            self.pending = kind
+
+    def _last(self) -> str:
+        for chunk in reversed(self.out):
+            if chunk:
+                return chunk
+        return ""
+
+    def _emit(self, token: str) -> None:
+        if self.pending and self.out:
+            last = self._last()[-1]
+            first = token[0]
+            if self.pending == "\n" and last not in "{;,([" and first not in "})]":
+                self.out.append("\n")
+            elif (_WORD.match(last) and _WORD.match(first)) or (last in "+-" and first in "+-") \
+                    or (last == "/" or first == "/") or (last.isdigit() and first == "."):
+                self.out.append(" ")
+        self.pending = ""
+        self.out.append(token)
+
+    def _regex_allowed(self) -> bool:
+        last = self._last()
+        if not last:
+            return True
+        if last[-1] in _REGEX_PRECEDERS:
+            return True
+        return last in _REGEX_KEYWORDS
+
+    def _scan_string(self, quote: str) -> str:
+        src, start = self.src, self.pos
+        self.pos += 1
+        while self.pos < len(src) and src[self.pos] != quote:
+            self.pos += 2 if src[self.pos] == "\\" else 1
+        self.pos += 1
+        return src[start:self.pos]
+
+    def _scan_regex(self) -> str:
+        src, start = self.src, self.pos
+        self.pos += 1
+        in_class = False
+        while self.pos < len(src):
+            ch = src[self.pos]
+            if ch == "\\":
+                self.pos += 2
+                continue
+            if ch == "[":
+                in_class = True
+            elif ch == "]":
+                in_class = False
+            elif ch == "/" and not in_class:
+                break
+            elif ch == "\n":
+                raise ValueError(f"Unterminated regular expression at offset {start}")
+            self.pos += 1
+        self.pos += 1
+        while self.pos < len(src) and _WORD.match(src[self.pos]):
+            self.pos += 1
+        return src[start:self.pos]
+
+    def _scan_template(self) -> str:
+        """Copy template text up to and including the closing backtick or the next "${" """
+        src, start = self.src, self.pos
+        while self.pos < len(src):
+            ch = src[self.pos]
+            if ch == "\\":
+                self.pos += 2
+            elif ch == "`":
+                self.pos += 1
+                return src[start:self.pos]
+            elif ch == "$" and src.startswith("${", self.pos):
+                self.pos += 2
+                self.depth += 1
+                self.template_depth.append(self.depth)
+                return src[start:self.pos]
+            else:
+                self.pos += 1
+        raise ValueError(f"Unterminated template literal at offset {start}")
+
+
+def minify_js(source: str) -> str:
+    return _JSMinifier(source).run()
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    stem, dot, suffix = name.rpartition(".")
+    return f"{ASSETS_DIR}/{stem}.{content_hash(data)}.{suffix}"
+
+
+def bundle_source(name: str, sources: List[str]) -> str:
+    if name.endswith(".css"):
+        return "\n".join(minify_css((FRONTEND_DIR / source).read_text(encoding="utf-8")) for source in sources)
+    parts = []
+    for source in sources:
+        code = minify_js((FRONTEND_DIR / source).read_text(encoding="utf-8"))
+        if source not in TOP_LEVEL_SOURCES:
+            code = f"(function(){{\n{code}\n}})();"
+        parts.append(code)
+    return "\n;".join(parts) + "\n"
+
+
+_LOCAL_ASSET = re.compile(
+    r'[ \t]*<script\b[^>]*\bsrc="(?!https?:|//)/?([^"]+)"[^>]*>\s*</script>[ \t]*\n?'
+    r'|[ \t]*<link\b[^>]*\bhref="(?!https?:|//)/?([^"]+\.css)"[^>]*>[ \t]*\n?'
+)
+_INLINE_BLOCK = re.compile(r"<(style|script)>(.*?)</\1>", re.S)
+
+
+def rewrite_page(html: str, bundles: Dict[str, str], sources: Dict[str, str],
+                 write_asset) -> Tuple[str, List[str]]:
+    """Point source references at their bundles and move inline blocks into hashed files
+
+    Returns the new page and the logical names of the bundles it references.
+    """
+    used: List[str] = []
+
+    def replace_reference(match: re.Match) -> str:
+        path = match.group(1) or match.group(2)
+        bundle = sources.get(path)
+        if bundle is None:
+            return match.group(0)
+        if bundle in used:
+            return ""  # already loaded by the first tag of its bundle
+        used.append(bundle)
+        return tag_for(bundle, bundles[bundle], match.group(0))
+
+    def tag_for(name: str, url: str, original: str) -> str:
+        indent = original[:len(original) - len(original.lstrip())]
+        if name.endswith(".css"):
+            return f'{indent}<link rel="stylesheet" href="/{url}">\n'
+        return f'{indent}<script src="/{url}"></script>\n'
+
+    html = _LOCAL_ASSET.sub(replace_reference, html)
+
+    counters = {"style": 0, "script": 0}
+
+    def extract_inline(match: re.Match) -> str:
+        kind, body = match.group(1), match.group(2)
+        counters[kind] += 1
+        index = counters[kind]
+        if kind == "style":
+            url = write_asset(f"page{index if index > 1 else ''}.css", minify_css(body))
+            return f'<link rel="stylesheet" href="/{url}">'
+        url = write_asset(f"page{index if index > 1 else ''}.js", minify_js(body) + "\n")
+        return f'<script src="/{url}"></script>'
+
+    html = _INLINE_BLOCK.sub(extract_inline, html)
+    return html, used
+
+
+def build_assets(dist: Path = DIST_DIR, page: Path = PROJECT_ROOT / "index.html") -> Dict:
+    """Build everything into `dist` and write its manifest; returns the manifest"""
+    started = time.perf_counter()
+    staging = dist.with_name(dist.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    (staging / ASSETS_DIR).mkdir(parents=True)
+
+    files: Dict[str, Dict] = {}
+
+    def write_asset(name: str, text: str, origin: Optional[List[str]] = None) -> str:
+        data = text.encode("utf-8")
+        url = hashed_name(name, data)
+        (staging / url).write_bytes(data)
+        files[url] = {"name": name, "size": len(data), "sources": origin or ["index.html"]}
+        return url
+
+    bundles = {name: write_asset(name, bundle_source(name, sources), sources) for name, sources in BUNDLES.items()}
+    sources = {source: name for name, members in BUNDLES.items() for source in members}
+
+    html, used = rewrite_page(page.read_text(encoding="utf-8"), bundles, sources, write_asset)
+    (staging / "index.html").write_text(html, encoding="utf-8")
+
+    source_bytes = sum((FRONTEND_DIR / source).stat().st_size for source in sources) + page.stat().st_size
+    manifest = {
+        "version": 1,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "bundles": bundles,
+        "sources": {source: bundles[name] for source, name in sources.items()},
+        "page_bundles": used,
+        "files": files,
+        "bytes": {"sources": source_bytes,
+                  "output": sum(entry["size"] for entry in files.values()) + len(html.encode("utf-8"))},
+    }
+    (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    # Swap in the finished tree so a running server never sees half a build
+    previous = dist.with_name(dist.name + ".old")
+    shutil.rmtree(previous, ignore_errors=True)
+    if dist.exists():
+        dist.rename(previous)
+    staging.rename(dist)
+    shutil.rmtree(previous, ignore_errors=True)
+
+    manifest["build_ms"] = (time.perf_counter() - started) * 1000
+    return manifest
+
+
+def load_manifest(dist: Path = DIST_DIR) -> Optional[Dict]:
+    try:
+        return json.loads((dist / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
@@ -18,9 +18,9 @@ class CityPredictionEngine {
     }
 
     createPredictionInterface() {
-        const interface = document.createElement('div');
-        interface.className = 'prediction-engine';
-        interface.innerHTML = `
+        const panel = document.createElement('div');
+        panel.className = 'prediction-engine';
+        panel.innerHTML = `
             <div class="prediction-header">
                 <h3>🔮 500+ Cities Prediction Engine</h3>
                 <p>Comprehensive air quality forecasting for all major Indian cities</p>
@@ -90,7 +90,7 @@ class CityPredictionEngine {
             </div>
         `;
 
-        this.container.appendChild(interface);
+        this.container.appendChild(panel);
         this.bindEvents();
         this.populateGrid();
         this.updateStats();
@@ -4,17 +4,53 @@ AeroHealth Ultimate Advanced - Frontend Development Server
 Enhanced with 3D Globe, Ultra AI, 500+ Cities, Health Intelligence
 """
 
+import argparse
+import gzip
+import hashlib
 import http.server
+import mimetypes
+import posixpath
+import socket
 import socketserver
+import threading
+import time
 import webbrowser
 import os
 import sys
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from build import ASSETS_DIR, DIST_DIR, FRONTEND_DIR, PROJECT_ROOT, build_assets, load_manifest
+
+try:
+    import brotli
+except ImportError:  # optional; gzip variants are always built
+    brotli = None
 
 # Configuration
 PORT = 5173
 HOST = "localhost"
 
+# index.html and app.js live at the project root, next to the frontend folder
+ROOT_FILES = ("index.html", "app.js")
+
+# Only these are served; sources, bytecode and other files in the tree are not
+ASSET_EXTENSIONS = frozenset({
+    ".html", ".css", ".js", ".mjs", ".json", ".map", ".txt", ".webmanifest",
+    ".svg", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf",
+})
+
+# Text types worth precompressing; smaller files go out as-is
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+COMPRESS_MIN_SIZE = 512
+# Browsers revalidate every load; unchanged files cost a 304
+CACHE_CONTROL = "no-cache"
+# Content-hashed build output never changes under its name
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 class EnhancedHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         # Add CORS headers for development
@@ -32,11 +68,332 @@ class EnhancedHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
         print(f"{emoji} {format % args}")
 
+class CachedFile(NamedTuple):
+    """Validators and precompressed variants of one file at one (mtime, size)"""
+    mtime_ns: int
+    size: int
+    content_type: str
+    etag: str
+    last_modified: str
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+
+
+class FileCache:
+    """In-memory file metadata and compressed bodies, rebuilt when a file's mtime or size changes
+
+    Identity bodies are not held: they go out with sendfile from the page
+    cache. Lookups take the stat of an already open file, so the entry
+    always describes the bytes that are about to be sent. Entries are
+    normally built by `warm` at startup; a file changed while running is
+    rebuilt under its own lock, so other files are never held up by it.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CachedFile] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, path: str) -> threading.Lock:
+        lock = self._locks.get(path)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(path, threading.Lock())
+        return lock
+
+    def get(self, path: str, handle, stat: os.stat_result) -> CachedFile:
+        entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+        with self._lock(path):
+            entry = self._entries.get(path)
+            if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                entry = self._entries[path] = self._load(path, handle, stat)
+        return entry
+
+    def warm(self, paths: Iterable[Path]) -> int:
+        """Build entries, compressed variants included, before the first request; returns the count"""
+        warmed = 0
+        for path in paths:
+            try:
+                with open(path, "rb") as handle:
+                    self.get(str(path), handle, os.fstat(handle.fileno()))
+            except OSError as e:
+                print(f"⚠️ Could not precompress {path}: {e}")
+                continue
+            warmed += 1
+        return warmed
+
+    @staticmethod
+    def _load(path: str, handle, stat: os.stat_result) -> CachedFile:
+        body = os.pread(handle.fileno(), stat.st_size, 0)
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+
+        gzipped = compressed = None
+        if len(body) >= COMPRESS_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+        return CachedFile(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            content_type=content_type,
+            etag=hashlib.blake2b(body, digest_size=12).hexdigest(),
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            gzip=gzipped if gzipped is not None and len(gzipped) < len(body) else None,
+            br=compressed if compressed is not None and len(compressed) < len(body) else None,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        entries = list(self._entries.values())
+        return {
+            "files": len(entries),
+            "bytes": sum(entry.size for entry in entries),
+            "compressed_bytes": sum(len(entry.gzip or b"") + len(entry.br or b"") for entry in entries),
+        }
+
+
+def is_asset(relative: str) -> bool:
+    """Whether a request path (relative to a served root) may be served"""
+    parts = relative.split("/")
+    if any(not part or part.startswith(".") or part == "__pycache__" for part in parts):
+        return False
+    return posixpath.splitext(relative)[1].lower() in ASSET_EXTENSIONS
+
+
+def served_files(built_assets: Iterable[str] = ()) -> List[Path]:
+    """Every file the production handler serves, as the paths it resolves them to"""
+    files = [
+        path for path in sorted(FRONTEND_DIR.rglob("*"))
+        if path.is_file() and DIST_DIR not in path.parents
+        and is_asset(path.relative_to(FRONTEND_DIR).as_posix())
+    ]
+    files += [PROJECT_ROOT / name for name in ROOT_FILES
+              if (PROJECT_ROOT / name).is_file() and not (FRONTEND_DIR / name).is_file()]
+    built = [DIST_DIR / relative for relative in built_assets]
+    if built:
+        built.append(DIST_DIR / "index.html")
+    return files + built
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class ProductionRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Static files with validators, precompressed variants and sendfile
+
+    Only the frontend folder and the project-root pages are served; there
+    are no directory listings and no per-request log lines (errors are
+    still printed).
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "AeroHealth"
+    timeout = 30
+    cache = FileCache()
+    # Hashed asset paths from the build manifest, when there is a build
+    built_assets: frozenset = frozenset()
+
+    @classmethod
+    def load_build(cls) -> bool:
+        manifest = load_manifest()
+        cls.built_assets = frozenset(manifest["files"]) if manifest else frozenset()
+        return manifest is not None
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; don't let Nagle hold the body back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def resolve(self) -> Optional[Path]:
+        path = posixpath.normpath(unquote(urlsplit(self.path).path))
+        if path in ("/", "."):
+            path = "/index.html"
+        relative = path.lstrip("/")
+        self.immutable = False
+        if not is_asset(relative) or relative.startswith(DIST_DIR.name + "/"):
+            return None
+
+        if relative.startswith(ASSETS_DIR + "/"):
+            if relative not in self.built_assets:
+                self.load_build()  # picks up a build made while running
+            if relative in self.built_assets:
+                self.immutable = True
+                return DIST_DIR / relative
+        if relative == "index.html" and self.built_assets:
+            return DIST_DIR / relative
+
+        candidate = FRONTEND_DIR / relative
+        if not candidate.is_file():
+            candidate = PROJECT_ROOT / relative if relative in ROOT_FILES else None
+        return candidate
+
+    def not_modified(self, entry: CachedFile, etags: Tuple[str, ...], etag: str) -> Optional[str]:
+        """The ETag to send with a 304, or None when the full response is due
+
+        A tag the client sent is echoed back as-is; otherwise the 304 carries
+        `etag`, the tag of the representation that would have been sent.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if etag in tags or "*" in tags:
+                return etag
+            return next((tag for tag in etags if tag in tags), None)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                if int(parsedate_to_datetime(if_modified_since).timestamp()) >= entry.mtime_ns // 1_000_000_000:
+                    return etag
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def send_file(self, head: bool) -> None:
+        path = self.resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        try:
+            handle = open(path, "rb")
+        except OSError:
+            self.send_error(404)
+            return
+
+        with handle:
+            entry = self.cache.get(str(path), handle, os.fstat(handle.fileno()))
+            # Each representation gets its own strong tag
+            etags = (f'"{entry.etag}"', f'"{entry.etag}-br"', f'"{entry.etag}-gz"')
+
+            encodings = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+            if entry.br is not None and encodings.get("br", 0) > 0:
+                body, encoding, etag = entry.br, "br", etags[1]
+            elif entry.gzip is not None and encodings.get("gzip", 0) > 0:
+                body, encoding, etag = entry.gzip, "gzip", etags[2]
+            else:
+                body, encoding, etag = None, None, etags[0]
+
+            matched = self.not_modified(entry, etags, etag)
+            if matched is not None:
+                self.send_response(304)
+                self.send_validators(entry)
+                self.send_header("ETag", matched)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", entry.content_type)
+            self.send_header("Content-Length", str(entry.size if body is None else len(body)))
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("ETag", etag)
+            self.send_validators(entry)
+            self.end_headers()
+            if head:
+                return
+            if body is not None:
+                self.wfile.write(body)
+            else:
+                self.connection.sendfile(handle, 0, entry.size)
+
+    def send_validators(self, entry: CachedFile) -> None:
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL if self.immutable else CACHE_CONTROL)
+        if entry.gzip is not None or entry.br is not None:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def do_GET(self):
+        self.send_file(head=False)
+
+    def do_HEAD(self):
+        self.send_file(head=True)
+
+    def log_request(self, code="-", size="-"):
+        pass
+
+    def log_message(self, format, *args):
+        print(f"⚠️ {self.address_string()} {format % args}")
+
+
+class ProductionHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+def serve_production(host: str, port: int) -> None:
+    """Serve the frontend with the threaded, caching production handler"""
+    with ProductionHTTPServer((host, port), ProductionRequestHandler) as httpd:
+        server_url = f"http://{host}:{port}"
+        print("🚀 Starting AeroHealth frontend (production mode)")
+        print(f"🌐 Server running at: {server_url}")
+        print(f"📁 Serving from: {FRONTEND_DIR} (+ {', '.join(ROOT_FILES)} from {PROJECT_ROOT})")
+        if ProductionRequestHandler.load_build():
+            print(f"📦 Serving the build in {DIST_DIR} ({len(ProductionRequestHandler.built_assets)} immutable assets)")
+        else:
+            print("📦 No build found; run with --build to bundle assets")
+        started = time.perf_counter()
+        warmed = ProductionRequestHandler.cache.warm(served_files(ProductionRequestHandler.built_assets))
+        print(f"🗜️ Precompressed {warmed} files (gzip{' + brotli' if brotli is not None else ''}) "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        print("🛑 Press Ctrl+C to stop the server")
+        httpd.serve_forever()
+
+
 def main():
     """Start the enhanced development server"""
 
+    parser = argparse.ArgumentParser(description="AeroHealth frontend server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--prod", action="store_true", help="threaded server with caching, validators and compression")
+    parser.add_argument("--build", action="store_true", help="bundle, minify and hash assets into dist/ (then serve with --prod)")
+    args = parser.parse_args()
+    host, port = args.host, args.port
+
+    if args.build:
+        try:
+            manifest = build_assets()
+        except (OSError, ValueError) as e:
+            print(f"❌ Build failed: {e}")
+            sys.exit(1)
+        sizes = manifest["bytes"]
+        print(f"📦 Built {len(manifest['files'])} assets into {DIST_DIR} in {manifest['build_ms']:.0f}ms "
+              f"({sizes['sources'] / 1024:.0f} KB -> {sizes['output'] / 1024:.0f} KB)")
+        for url, entry in manifest["files"].items():
+            print(f"  🎨 {url} ({entry['size'] / 1024:.1f} KB) <- {', '.join(entry['sources'])}")
+        if not args.prod:
+            return
+
+    if args.prod:
+        try:
+            serve_production(host, port)
+        except OSError as e:
+            print(f"❌ Server error: {e}")
+            sys.exit(1)
+        except KeyboardInterrupt:
+            print("\n🛑 Server stopped by user")
+        return
+
     # Change to the frontend directory
-    frontend_dir = Path(__file__).parent
+    frontend_dir = FRONTEND_DIR
     os.chdir(frontend_dir)
 
     print("🚀 Starting AeroHealth Ultimate Advanced Development Server...")
@@ -50,8 +407,8 @@ def main():
     print("="*80)
 
     try:
-        with socketserver.TCPServer((HOST, PORT), EnhancedHTTPRequestHandler) as httpd:
-            server_url = f"http://{HOST}:{PORT}"
+        with socketserver.TCPServer((host, port), EnhancedHTTPRequestHandler) as httpd:
+            server_url = f"http://{host}:{port}"
 
             print(f"🌐 Server running at: {server_url}")
             print(f"📁 Serving from: {frontend_dir}")
@@ -94,9 +451,9 @@ def main():
 
     except OSError as e:
         if "Address already in use" in str(e):
-            print(f"❌ Port {PORT} is already in use!")
+            print(f"❌ Port {port} is already in use!")
             print("💡 Solutions:")
-            print(f"  1. Kill the process using port {PORT}")
+            print(f"  1. Kill the process using port {port}")
             print(f"  2. Use a different port: python start.py --port 3000")
             print(f"  3. Wait a moment and try again")
         else: